@@ -202,14 +202,26 @@ def _sha256_of_file(p: Path) -> str:
             h.update(chunk)
     return h.hexdigest()
 
-def _save_pdf_to_store(source_path: Path) -> tuple[Optional[int], Optional[str]]:
-    """Guarda el PDF de entrada en store/inputs/{sha}.pdf"""
+async def _write_upload(file: UploadFile, dest: Path) -> str:
+    """
+    Escribe el archivo subido en `dest` por bloques de 1 MiB y regresa su SHA256,
+    calculado al vuelo (sin cargarlo completo en memoria ni volver a leerlo).
+    """
+    h = hashlib.sha256()
+    with dest.open("wb") as f:
+        while chunk := await file.read(1024 * 1024):
+            h.update(chunk)
+            f.write(chunk)
+    return h.hexdigest()
+
+def _save_pdf_to_store(source_path: Path, sha: Optional[str] = None) -> tuple[Optional[int], Optional[str]]:
+    """Guarda el PDF de entrada en store/inputs/{sha}.pdf (con `sha` ya calculado no se relee)"""
     try:
         tam = source_path.stat().st_size
     except Exception:
         tam = None
     try:
-        sha = _sha256_of_file(source_path)
+        sha = sha or _sha256_of_file(source_path)
         if sha:
             target_pdf = INPUT_DIR / f"{sha}.pdf"
             if not target_pdf.exists():
@@ -626,9 +638,9 @@ async def extract_generic(
         extractor = _get_extractor(bank)
         workdir = _mk_workdir()
         pdf_path = workdir / original_name
-        pdf_path.write_bytes(await file.read())
+        upload_sha = await _write_upload(file, pdf_path)
 
-        tam, sha = _save_pdf_to_store(pdf_path)
+        tam, sha = _save_pdf_to_store(pdf_path, upload_sha)
         id_usuario, nombre_usuario = get_user_info_from_jwt(user)
         row_id = _insert_processing(original_name, bank, empresa, RESULT_APP2DB["excel"], tam, sha, id_usuario, nombre_usuario)
 
@@ -674,9 +686,9 @@ async def extract_with_cep_generic(
 
         workdir = _mk_workdir()
         pdf_path = workdir / original_name
-        pdf_path.write_bytes(await file.read())
+        upload_sha = await _write_upload(file, pdf_path)
 
-        tam, sha = _save_pdf_to_store(pdf_path)
+        tam, sha = _save_pdf_to_store(pdf_path, upload_sha)
         id_usuario, nombre_usuario = get_user_info_from_jwt(user)
         row_id = _insert_processing(original_name, bank, empresa, RESULT_APP2DB["excel+cep"], tam, sha, id_usuario, nombre_usuario)
 
@@ -730,8 +742,8 @@ async def extract_santander_only(background_tasks: BackgroundTasks, file: Upload
     try:
         workdir = _mk_workdir()
         pdf_path = workdir / original_name
-        pdf_path.write_bytes(await file.read())
-        tam, sha = _save_pdf_to_store(pdf_path)
+        upload_sha = await _write_upload(file, pdf_path)
+        tam, sha = _save_pdf_to_store(pdf_path, upload_sha)
         id_usuario, nombre_usuario = get_user_info_from_jwt(user)
         row_id = _insert_processing(original_name, bank, empresa, RESULT_APP2DB["excel"], tam, sha, id_usuario, nombre_usuario)
 
@@ -771,8 +783,8 @@ async def extract_santander_with_cep(background_tasks: BackgroundTasks, file: Up
 
         workdir = _mk_workdir()
         pdf_path = workdir / original_name
-        pdf_path.write_bytes(await file.read())
-        tam, sha = _save_pdf_to_store(pdf_path)
+        upload_sha = await _write_upload(file, pdf_path)
+        tam, sha = _save_pdf_to_store(pdf_path, upload_sha)
         id_usuario, nombre_usuario = get_user_info_from_jwt(user)
         row_id = _insert_processing(original_name, bank, empresa, RESULT_APP2DB["excel+cep"], tam, sha, id_usuario, nombre_usuario)
 
@@ -816,8 +828,8 @@ async def extract_banorte_only(background_tasks: BackgroundTasks, file: UploadFi
     try:
         workdir = _mk_workdir()
         pdf_path = workdir / original_name
-        pdf_path.write_bytes(await file.read())
-        tam, sha = _save_pdf_to_store(pdf_path)
+        upload_sha = await _write_upload(file, pdf_path)
+        tam, sha = _save_pdf_to_store(pdf_path, upload_sha)
         id_usuario, nombre_usuario = get_user_info_from_jwt(user)
         row_id = _insert_processing(original_name, bank, empresa, RESULT_APP2DB["excel"], tam, sha, id_usuario, nombre_usuario)
 
@@ -855,8 +867,8 @@ async def extract_banorte_with_cep(background_tasks: BackgroundTasks, file: Uplo
 
         workdir = _mk_workdir()
         pdf_path = workdir / original_name
-        pdf_path.write_bytes(await file.read())
-        tam, sha = _save_pdf_to_store(pdf_path)
+        upload_sha = await _write_upload(file, pdf_path)
+        tam, sha = _save_pdf_to_store(pdf_path, upload_sha)
         id_usuario, nombre_usuario = get_user_info_from_jwt(user)
         row_id = _insert_processing(original_name, bank, empresa, RESULT_APP2DB["excel+cep"], tam, sha, id_usuario, nombre_usuario)
 
@@ -898,8 +910,8 @@ async def extract_bbva_only(background_tasks: BackgroundTasks, file: UploadFile
     try:
         workdir = _mk_workdir()
         pdf_path = workdir / original_name
-        pdf_path.write_bytes(await file.read())
-        tam, sha = _save_pdf_to_store(pdf_path)
+        upload_sha = await _write_upload(file, pdf_path)
+        tam, sha = _save_pdf_to_store(pdf_path, upload_sha)
         id_usuario, nombre_usuario = get_user_info_from_jwt(user)
         row_id = _insert_processing(original_name, bank, empresa, RESULT_APP2DB["excel"], tam, sha, id_usuario, nombre_usuario)
 
@@ -937,8 +949,8 @@ async def extract_bbva_with_cep(background_tasks: BackgroundTasks, file: UploadF
 
         workdir = _mk_workdir()
         pdf_path = workdir / original_name
-        pdf_path.write_bytes(await file.read())
-        tam, sha = _save_pdf_to_store(pdf_path)
+        upload_sha = await _write_upload(file, pdf_path)
+        tam, sha = _save_pdf_to_store(pdf_path, upload_sha)
         id_usuario, nombre_usuario = get_user_info_from_jwt(user)
         row_id = _insert_processing(original_name, bank, empresa, RESULT_APP2DB["excel+cep"], tam, sha, id_usuario, nombre_usuario)
 
@@ -981,8 +993,8 @@ async def extract_inbursa_only(background_tasks: BackgroundTasks, file: UploadFi
     try:
         workdir = _mk_workdir()
         pdf_path = workdir / original_name
-        pdf_path.write_bytes(await file.read())
-        tam, sha = _save_pdf_to_store(pdf_path)
+        upload_sha = await _write_upload(file, pdf_path)
+        tam, sha = _save_pdf_to_store(pdf_path, upload_sha)
         id_usuario, nombre_usuario = get_user_info_from_jwt(user)
         row_id = _insert_processing(original_name, bank, empresa, RESULT_APP2DB["excel"], tam, sha, id_usuario, nombre_usuario)
 
@@ -1020,8 +1032,8 @@ async def extract_inbursa_with_cep(background_tasks: BackgroundTasks, file: Uplo
 
         workdir = _mk_workdir()
         pdf_path = workdir / original_name
-        pdf_path.write_bytes(await file.read())
-        tam, sha = _save_pdf_to_store(pdf_path)
+        upload_sha = await _write_upload(file, pdf_path)
+        tam, sha = _save_pdf_to_store(pdf_path, upload_sha)
         id_usuario, nombre_usuario = get_user_info_from_jwt(user)
         row_id = _insert_processing(original_name, bank, empresa, RESULT_APP2DB["excel+cep"], tam, sha, id_usuario, nombre_usuario)
 
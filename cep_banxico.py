@@ -6,6 +6,7 @@ from __future__ import annotations
 # Requisitos:
 #   pip install playwright pandas openpyxl
 #   playwright install --with-deps chromium
+#   (opcional) pip install python-calamine   # lectura XLSX más rápida
 # ————————————————————————————————————————————————————————————————
 
 import sys, asyncio
@@ -15,15 +16,15 @@ if sys.platform.startswith("win"):
     except Exception:
         pass
 
-import unicodedata, re
+import functools, unicodedata
 import os, re, json, zipfile, shutil
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 
 import pandas as pd
 from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter
 
 # -------------------------------------------------------------------
 # Extractores opcionales si se usa modo --pdf
@@ -48,6 +49,30 @@ try:
 except Exception:
     extract_inbursa_to_xlsx = None
 
+# Coincidencia difusa de nombres de banco (opcional: pip install rapidfuzz)
+try:
+    from rapidfuzz import fuzz as _fuzz, process as _fuzz_process
+except Exception:
+    _fuzz = _fuzz_process = None
+
+# -------------------------------------------------------------------
+# Motor de lectura XLSX: calamine (Rust, mucho más rápido) si está
+# instalado (pip install python-calamine) y pandas lo soporta (>=2.2);
+# si no, openpyxl.
+# -------------------------------------------------------------------
+def _pandas_version() -> Tuple[int, int]:
+    try:
+        major, minor = pd.__version__.split(".")[:2]
+        return int(major), int(re.match(r"\d+", minor).group())
+    except Exception:
+        return 0, 0
+
+try:
+    import python_calamine  # noqa: F401
+    _EXCEL_ENGINE = "calamine" if _pandas_version() >= (2, 2) else "openpyxl"
+except Exception:
+    _EXCEL_ENGINE = "openpyxl"
+
 
 # -------------------------------------------------------------------
 # Diccionarios
@@ -85,6 +110,29 @@ RE_CLABE18_PLUS_KEY      = re.compile(r"(?<!\d)(\d{18})(?!\d)\s*([A-Z0-9]{10,32}
 RE_BBVA_ENVIADO  = re.compile(r"(?i)\bENVIAD[OA]\b")
 RE_BBVA_RECIBIDO = re.compile(r"(?i)\bRECIBID[OA]\b")
 
+# Hojas/columnas del Excel generado por los extractores
+RE_CUENTA_SHEET  = re.compile(r"^\s*cuenta[\s_]*0?(\d+)\s*$", re.I)  # 'cuenta_01', 'CUENTA 02'…
+RE_CUENTA_PREFIX = re.compile(r"^cuent", re.I)                       # 'cuenta', 'cuentas'…
+RE_CLABE_COL     = re.compile(r"\bclabe\b", re.I)
+RE_DIGITS18      = re.compile(r"(\d{18})")
+
+# Etiquetas/botones del formulario de Banxico (Playwright)
+RE_LBL_FECHA_PAGO   = re.compile(r"Fecha.*realiz[oó]\s+el\s+pago", re.I)
+RE_LBL_CRITERIO     = re.compile(r"Criterio\s+de\s+b[uú]squeda", re.I)
+RE_LBL_CLAVE_O_REF  = re.compile(r"Clave\s+de\s+rastreo|N[uú]mero\s+de\s+referencia", re.I)
+RE_LBL_CLAVE_REF    = re.compile(r"(Clave|N[uú]mero)\s+de\s+(rastreo|referencia)", re.I)
+RE_LBL_EMISORA      = re.compile(r"Instituci[oó]n\s+emisora\s+del\s+pago", re.I)
+RE_LBL_RECEPTORA    = re.compile(r"Instituci[oó]n\s+receptora\s+del\s+pago", re.I)
+RE_LBL_CUENTA_BENEF = re.compile(r"Cuenta\s+Beneficiaria", re.I)
+RE_LBL_MONTO        = re.compile(r"Monto\s+del\s+pago", re.I)
+RE_LBL_CAPTCHA      = re.compile(r"C[oó]digo\s+de\s+seguridad", re.I)
+RE_BTN_ACEPTAR      = re.compile(r"Aceptar|De acuerdo|OK", re.I)
+RE_BTN_DESCARGAR    = re.compile(r"Descargar\s+CEP", re.I)
+
+# Normalización de textos de <option>
+RE_WS           = re.compile(r"\s+")
+RE_NOT_ALNUM_SP = re.compile(r"[^A-Z0-9 ]")
+
 
 # Variantes de columnas por hoja (aceptamos listas)
 SHEET_SIGNATURES: Dict[str, Dict[str, List[str]]] = {
@@ -122,21 +170,24 @@ SHEET_SIGNATURES: Dict[str, Dict[str, List[str]]] = {
         "ret_cols": ["Retiros/Cargos","Retiros","Cargos","Retiro"],
     },
 }
+# Todas las columnas que alguna firma puede consultar (para usecols)
+_SIG_COLUMNS = frozenset(
+    c for sig in SHEET_SIGNATURES.values() for cols in sig.values() for c in cols
+)
 
 # -------------------------------------------------------------------
 # Utils
 # -------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=65536)
 def _norm(s: str | None) -> str:
     s = unicodedata.normalize("NFD", s or "")
     s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
     return re.sub(r"[^A-Z0-9 ]", " ", s.upper()).strip()
 
-def _norm(s: str | None) -> str:
-    import unicodedata, re
-    s = unicodedata.normalize("NFD", s or "")
-    s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
-    return s.upper().strip()
+# Nombres de banco normalizados una sola vez (más largo primero: "BANCO DEL BIENESTAR" antes que nombres cortos)
+_NORM_NAME_TO_CODE: Dict[str, str] = {_norm(name): code for code, name in BANKS_BY_CODE.items()}
+_NORM_NAMES: List[Tuple[str, str]] = sorted(_NORM_NAME_TO_CODE.items(), key=lambda kv: -len(kv[0]))
 
 def _first_existing(df: pd.DataFrame, options: List[str]) -> Optional[str]:
     for c in options:
@@ -188,8 +239,8 @@ def _bank_code_from_text(text: str | None) -> str | None:
         return m.group(1)
 
     # 2) por nombre exacto de BANKS_BY_CODE
-    for code, name in BANKS_BY_CODE.items():
-        if _norm(name) in t:
+    for norm_name, code in _NORM_NAMES:
+        if norm_name in t:
             return code
 
     # 3) sinónimos habituales
@@ -251,9 +302,9 @@ def _code_from_bank_in_info(info_df: pd.DataFrame) -> tuple[str | None, str | No
         else:
             # último intento por coincidencia exacta del nombre en el texto
             r = _norm(raw)
-            for code, name in BANKS_BY_CODE.items():
-                if _norm(name) in r:
-                    own_code, own_name = code, name
+            for norm_name, code in _NORM_NAMES:
+                if norm_name in r:
+                    own_code, own_name = code, BANKS_BY_CODE[code]
                     break
     except Exception:
         pass
@@ -262,40 +313,38 @@ def _code_from_bank_in_info(info_df: pd.DataFrame) -> tuple[str | None, str | No
 # === NUEVO: detectar la CLABE desde la hoja "cuenta"/"cuentas" =================
 def _read_clabe_from_cuenta_sheet(xlsx_path: str) -> Optional[str]:
     try:
-        xls = pd.ExcelFile(xlsx_path)
+        xls = pd.ExcelFile(xlsx_path, engine=_EXCEL_ENGINE)
     except Exception:
         return None
 
     # Buscar hoja cuyo nombre empiece con "cuent" (cuenta, cuentas…)
     cuenta_sheet = None
     for s in xls.sheet_names:
-        if re.search(r"^cuent", s.strip().lower()):
+        if RE_CUENTA_PREFIX.match(s.strip()):
             cuenta_sheet = s
             break
     if not cuenta_sheet:
         return None
 
     try:
-        df = pd.read_excel(xlsx_path, sheet_name=cuenta_sheet, dtype=str)
+        df = pd.read_excel(xlsx_path, sheet_name=cuenta_sheet, dtype=str, engine=_EXCEL_ENGINE)
     except Exception:
         return None
 
     # 1) Si existe columna CLABE explícita
-    clabe_col = _get_col_like(df, re.compile(r"\bclabe\b", re.I))
+    clabe_col = _get_col_like(df, RE_CLABE_COL)
     found: List[str] = []
     if clabe_col:
         for v in df[clabe_col].astype(str).tolist():
-            m = re.search(r"(\d{18})", str(v))
+            m = RE_DIGITS18.search(v)
             if m:
                 found.append(m.group(1))
 
     # 2) Si no, buscar 18 dígitos en todo el DF
     if not found:
-        for col in df.columns:
-            for v in df[col].astype(str).tolist():
-                m = re.search(r"(\d{18})", str(v))
-                if m:
-                    found.append(m.group(1))
+        # Un solo barrido vectorizado (columna por columna, como antes)
+        cells = pd.Series(df.astype(str).to_numpy().ravel(order="F"))
+        found = cells.str.extract(RE_DIGITS18, expand=False).dropna().tolist()
 
     found = list(dict.fromkeys(found))  # únicos, preservando orden
     if len(found) == 1:
@@ -303,14 +352,12 @@ def _read_clabe_from_cuenta_sheet(xlsx_path: str) -> Optional[str]:
     # Si hay varias y no podemos decidir, no forzamos (que caiga al de info)
     return None
 
-import itertools
-
 def _sheet_index_from_name(sheet_name: str) -> Optional[int]:
     """
     Devuelve 0 para 'cuenta_01', 1 para 'cuenta_02', etc. Si no matchea, None.
     Acepta variantes: 'cuenta 01', 'CUENTA_02', etc.
     """
-    m = re.match(r"(?i)^\s*cuenta[\s_]*0?(\d+)\s*$", sheet_name or "")
+    m = RE_CUENTA_SHEET.match(sheet_name or "")
     if not m:
         return None
     idx = int(m.group(1)) - 1
@@ -323,36 +370,35 @@ def _read_all_clabes_from_cuentas(xlsx_path: str) -> List[str]:
     en orden de aparición y sin duplicados.
     """
     try:
-        xls = pd.ExcelFile(xlsx_path)
+        xls = pd.ExcelFile(xlsx_path, engine=_EXCEL_ENGINE)
     except Exception:
         return []
 
     cuentas_sheet = None
     for s in xls.sheet_names:
-        if re.search(r"^cuent", s.strip().lower()):
+        if RE_CUENTA_PREFIX.match(s.strip()):
             cuentas_sheet = s
             break
     if not cuentas_sheet:
         return []
 
     try:
-        df = pd.read_excel(xlsx_path, sheet_name=cuentas_sheet, dtype=str)
+        df = pd.read_excel(xlsx_path, sheet_name=cuentas_sheet, dtype=str, engine=_EXCEL_ENGINE)
     except Exception:
         return []
 
     # 1) Si hay columna 'Clabe' explícita
-    clabe_col = _get_col_like(df, re.compile(r"\bclabe\b", re.I))
+    clabe_col = _get_col_like(df, RE_CLABE_COL)
     values: List[str] = []
     if clabe_col:
         for v in df[clabe_col].astype(str).tolist():
-            m = re.search(r"(\d{18})", v)
+            m = RE_DIGITS18.search(v)
             if m: values.append(m.group(1))
 
     # 2) Si no, buscar 18 dígitos en todas las columnas
     if not values:
-        for v in itertools.chain.from_iterable(df.astype(str).values.tolist()):
-            m = re.search(r"(\d{18})", str(v))
-            if m: values.append(m.group(1))
+        cells = pd.Series(df.astype(str).to_numpy().ravel())  # por filas
+        values = cells.str.extract(RE_DIGITS18, expand=False).dropna().tolist()
 
     # Únicos preservando orden
     seen, result = set(), []
@@ -373,7 +419,7 @@ def _build_sheet_clabe_map(xlsx_path: str) -> Dict[str, str]:
 
     mapping: Dict[str, str] = {}
     try:
-        xls = pd.ExcelFile(xlsx_path)
+        xls = pd.ExcelFile(xlsx_path, engine=_EXCEL_ENGINE)
     except Exception:
         return {}
 
@@ -411,7 +457,7 @@ def _read_info(xlsx_path: str) -> Tuple[Optional[str], Optional[str], Dict[str,
 
     # 2) Luego leemos "info" para el banco y, si falla lo anterior, la CLABE
     try:
-        df = pd.read_excel(xlsx_path, sheet_name="info", dtype=str)
+        df = pd.read_excel(xlsx_path, sheet_name="info", dtype=str, engine=_EXCEL_ENGINE)
     except Exception:
         return None, clabe_from_cuenta, {}
 
@@ -429,7 +475,7 @@ def _read_info(xlsx_path: str) -> Tuple[Optional[str], Optional[str], Dict[str,
         own_clabe = clabe_from_cuenta
     else:
         raw_clabe = str(row.get(clabe_col) or "").strip()
-        m = re.search(r"(\d{18})", raw_clabe)
+        m = RE_DIGITS18.search(raw_clabe)
         own_clabe = m.group(1) if m else None
 
     row = {k: (None if pd.isna(v) else v) for k, v in row.items()}
@@ -527,7 +573,7 @@ def _detect_jobs_in_sheet(
 
     jobs: List[CepJob] = []
     for i, r in df.iterrows():
-        desc = str(r.get(desc_col) or "").strip()
+        desc = r[desc_col].strip()
         if not desc:
             continue
 
@@ -615,12 +661,17 @@ def _detect_jobs_in_sheet(
 def collect_jobs_from_xlsx(xlsx_path: str) -> Tuple[List[CepJob], Dict[str, List[int]]]:
     own_code, own_clabe, _info = _read_info(xlsx_path)
     sheet_clabe_map = _build_sheet_clabe_map(xlsx_path)
-    xls = pd.ExcelFile(xlsx_path)
+    xls = pd.ExcelFile(xlsx_path, engine=_EXCEL_ENGINE)
     all_jobs: List[CepJob] = []
     rows_idx_by_sheet: Dict[str, List[int]] = {}
 
     for sheet in xls.sheet_names:
-        df = pd.read_excel(xlsx_path, sheet_name=sheet)
+        # dtype=str + celdas vacías como "": _detect_jobs_in_sheet recibe solo str.
+        # Solo cargamos columnas que alguna firma usa (fecha/desc/abonos/cargos).
+        df = pd.read_excel(
+            xlsx_path, sheet_name=sheet, dtype=str, keep_default_na=False,
+            usecols=lambda c: c in _SIG_COLUMNS, engine=_EXCEL_ENGINE,
+        )
         jobs = _detect_jobs_in_sheet(df, sheet, own_code, own_clabe, sheet_clabe_map)
         if jobs:
             all_jobs.extend(jobs)
@@ -671,8 +722,7 @@ def _force_set_input_value(locator, value: str):
         pass
 
 def _handle_captcha(frm, page, workdir: Path, headless: bool) -> bool:
-    import re, os
-    code = frm.get_by_label(re.compile(r"C[oó]digo\s+de\s+seguridad", re.I))
+    code = frm.get_by_label(RE_LBL_CAPTCHA)
     if not code or code.count() == 0:
         return True
     try:
@@ -717,7 +767,6 @@ def _click_descargar_y_bajar_pdf(page, frm, out_path: Path) -> Optional[Path]:
       4) Usa TABx4 + ENTER como fallback
       5) Captura screenshots de debug si falla
     """
-    import re as _re
     try:
         out_path.parent.mkdir(parents=True, exist_ok=True)
     except Exception:
@@ -736,7 +785,7 @@ def _click_descargar_y_bajar_pdf(page, frm, out_path: Path) -> Optional[Path]:
     if not btn or btn.count() == 0:
         try:
             # Método 2: Por role y texto
-            btn = frm.get_by_role("button", name=_re.compile(r"Descargar\s+CEP", _re.I)).first
+            btn = frm.get_by_role("button", name=RE_BTN_DESCARGAR).first
             if btn and btn.count() > 0:
                 print("[CEP] Botón encontrado por role y texto")
         except Exception:
@@ -777,7 +826,7 @@ def _click_descargar_y_bajar_pdf(page, frm, out_path: Path) -> Optional[Path]:
 
     # Cerrar posibles popups/modals
     try:
-        page.get_by_role("button", name=_re.compile(r"Aceptar|De acuerdo|OK", _re.I)).click(timeout=1200)
+        page.get_by_role("button", name=RE_BTN_ACEPTAR).click(timeout=1200)
         print("[CEP] Modal/popup cerrado")
     except Exception:
         pass
@@ -876,14 +925,42 @@ def _datepicker_container(frame):
     )
     return frame.locator(sel).first
 
+_CSS_BTN_DESCARGAR = "#btn_Descargar, button:has-text('Descargar'), a:has-text('Descargar')"
+_JS_MONTO_READY = """
+() => {
+  const m = document.querySelector("#monto, input[name*='monto' i]");
+  return !m || !m.disabled;  // si no lo encontramos por CSS, no hay nada que esperar
+}
+"""
+
+# Navegación de meses del datepicker
+_CSS_DP_PREV = "th.prev, .ui-datepicker-prev, button[aria-label*='Prev' i], button[aria-label*='Anterior' i]"
+_CSS_DP_NEXT = "th.next, .ui-datepicker-next, button[aria-label*='Next' i], button[aria-label*='Siguiente' i]"
+# Celdas de día del mes visible: bootstrap-datepicker y jQuery UI
+_CSS_DP_DAYS = (
+    "td.day:not(.old):not(.new)",
+    ".ui-datepicker-calendar td:not(.ui-datepicker-other-month) a",
+)
+_JS_DP_NAVIGATE = """
+(el, [css, n]) => {
+  let i = 0;
+  for (; i < n; i++) {
+    const btn = (el.isConnected ? el : document).querySelector(css);
+    if (!btn) break;
+    btn.click();
+  }
+  return i;
+}
+"""
+
+@functools.lru_cache(maxsize=4096)
 def _norm_txt(s: Optional[str]) -> str:
     if not s:
         return ""
-    import unicodedata, re
     s = unicodedata.normalize("NFD", str(s))
     s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
-    s = re.sub(r"\s+", " ", s).strip().upper()
-    s = re.sub(r"[^A-Z0-9 ]", "", s)
+    s = RE_WS.sub(" ", s).strip().upper()
+    s = RE_NOT_ALNUM_SP.sub("", s)
     return s
 
 _BANK_SYNONYMS = {
@@ -894,28 +971,22 @@ _BANK_SYNONYMS = {
     "INBURSA": ["INBURSA", "BANCO INBURSA"],
 }
 
-def _norm_txt(s: Optional[str]) -> str:
-    if not s:
-        return ""
-    import unicodedata, re
-    s = unicodedata.normalize("NFD", str(s))
-    s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
-    s = re.sub(r"\s+", " ", s).strip().upper()
-    s = re.sub(r"[^A-Z0-9 ]", "", s)
-    return s
-
 _BANK_SYNONYMS_NORM = {
     _norm_txt(k): [_norm_txt(alias) for alias in v]
     for k, v in _BANK_SYNONYMS.items()
 }
+# Conjunto aceptado (nombre + aliases) ya congelado por banco
+_BANK_SYNONYMS_FROZEN = {k: frozenset([k] + list(v)) for k, v in _BANK_SYNONYMS_NORM.items()}
 
-# Script robusto para elegir una opción por texto (con aliases)
+# Script robusto para elegir una opción por texto (con aliases).
+# Se instala una sola vez por contexto (ctx.add_init_script) como window.__pickOption;
+# en cada selección solo se evalúa el trampolín _JS_CALL_PICK_OPTION.
 _JS_PICK_OPTION = r"""
-function __norm(s){
-  return (s||"").normalize('NFD').replace(/[\u0300-\u036f]/g,'')
-           .toUpperCase().replace(/[^A-Z0-9 ]/g,'').replace(/\s+/g,' ').trim();
-}
-return (function(selectEl, wanted, aliases){
+window.__pickOption = function(selectEl, wanted, aliases){
+  function __norm(s){
+    return (s||"").normalize('NFD').replace(/[\u0300-\u036f]/g,'')
+             .toUpperCase().replace(/[^A-Z0-9 ]/g,'').replace(/\s+/g,' ').trim();
+  }
   const desired = __norm(wanted);
   const wanteds = new Set([desired].concat(aliases||[]));
   // 1) igualdad exacta o por inclusión amplia
@@ -928,8 +999,12 @@ return (function(selectEl, wanted, aliases){
     }
   }
   return false;
-})(arguments[0], arguments[1], arguments[2]);
+};
 """
+_JS_CALL_PICK_OPTION = "(el, a) => !!window.__pickOption && window.__pickOption(el, a[0], a[1])"
+
+_JS_OPTION_PAIRS = "el => Array.from(el.options).map(o => [(o.textContent || '').trim(), o.value])"
+
 def _get_selected_text(sel) -> str:
     try:
         return (sel.evaluate(
@@ -947,7 +1022,7 @@ def _select_option_by_label_loose(frame, label_rx: re.Pattern, wanted_text: Opti
         return
 
     desired = _norm_txt(wanted_text)
-    aliases_norm = set(_BANK_SYNONYMS_NORM.get(desired, []))
+    accepted = _BANK_SYNONYMS_FROZEN.get(desired) or frozenset({desired})
 
     # 1) Candidatos: por label y por heurística de nombre/id (muy amplio)
     candidates = []
@@ -993,45 +1068,42 @@ def _select_option_by_label_loose(frame, label_rx: re.Pattern, wanted_text: Opti
             pass
 
     def _try_value_on(sel) -> bool:
-        # (a) intento directo por label
+        # (a) intento directo por label (Playwright lanza si no hay opción con ese label)
         try:
             sel.select_option(label=wanted_text)
-            # validar
-            if _norm_txt(_get_selected_text(sel)) in ({desired} | aliases_norm):
-                return True
+            return True
         except Exception:
             pass
 
         # (b) barrido de <option> con comparación normalizada
+        #     (todas las parejas texto/valor en un solo viaje al navegador)
         try:
-            opts = sel.locator("option")
-            cnt = opts.count()
-            best_val, best_score = None, -1
-            for i in range(cnt):
-                o = opts.nth(i)
-                txt = (o.inner_text() or "").strip()
-                val = (o.get_attribute("value") or "").strip()
-                if not (txt or val):
-                    continue
-                nt = _norm_txt(txt)
-                score = 0
-                if nt == desired or nt in aliases_norm:
-                    score = 100
-                elif nt.startswith(desired) or desired in nt:
-                    score = 80
-                if score > best_score:
-                    best_score, best_val = score, (val or txt)
+            pairs = sel.evaluate(_JS_OPTION_PAIRS) or []
+            choices: Dict[str, str] = {}  # value -> texto normalizado
+            for txt, val in pairs:
+                txt = (txt or "").strip()
+                val = (val or "").strip()
+                if txt or val:
+                    choices[val or txt] = _norm_txt(txt)
+            # exacto / alias primero; luego similitud difusa (rapidfuzz) o inclusión
+            best_val = next((v for v, nt in choices.items() if nt in accepted), None)
+            if best_val is None and desired:
+                if _fuzz_process is not None:
+                    m = _fuzz_process.extractOne(desired, choices, scorer=_fuzz.WRatio, score_cutoff=75)
+                    best_val = m[2] if m else None
+                else:
+                    best_val = next((v for v, nt in choices.items() if nt.startswith(desired) or desired in nt), None)
             if best_val is not None:
                 sel.select_option(value=best_val)
-                if _norm_txt(_get_selected_text(sel)) in ({desired} | aliases_norm):
-                    return True
+                return True
         except Exception:
             pass
 
         # (c) último recurso: JavaScript que ajusta selectedIndex + change
+        #     (única lectura de verificación: aquí no hay excepción que nos avise)
         try:
-            ok = sel.evaluate(_JS_PICK_OPTION, wanted_text, list(aliases_norm))
-            if ok and _norm_txt(_get_selected_text(sel)) in ({desired} | aliases_norm):
+            ok = sel.evaluate(_JS_CALL_PICK_OPTION, [wanted_text, list(accepted)])
+            if ok and _norm_txt(_get_selected_text(sel)) in accepted:
                 return True
         except Exception:
             pass
@@ -1053,7 +1125,7 @@ def _select_option_by_label_loose(frame, label_rx: re.Pattern, wanted_text: Opti
 
 
 def _set_date_in_picker(frame, date_str_ddmmyyyy: str) -> None:
-    fi = frame.get_by_label(re.compile(r"Fecha.*realiz[oó]\s+el\s+pago", re.I))
+    fi = frame.get_by_label(RE_LBL_FECHA_PAGO)
 
     try:
         fi.click()
@@ -1061,8 +1133,24 @@ def _set_date_in_picker(frame, date_str_ddmmyyyy: str) -> None:
         except Exception: pass
         try: fi.press("Delete")
         except Exception: pass
-        for ch in date_str_ddmmyyyy:
-            fi.type(ch, delay=30)
+        fi.fill(date_str_ddmmyyyy)
+        try:
+            fi.evaluate(
+                "el => { el.dispatchEvent(new Event('input',{bubbles:true}));"
+                " el.dispatchEvent(new Event('change',{bubbles:true})); }"
+            )
+        except Exception:
+            pass
+        try:
+            val = fi.input_value(timeout=800).strip()
+            if val == date_str_ddmmyyyy:
+                return
+        except Exception:
+            pass
+        # Si el datepicker no aceptó el fill, tecleo sin pausas
+        try: fi.press("Control+A")
+        except Exception: pass
+        fi.press_sequentially(date_str_ddmmyyyy, delay=0)
         try:
             val = fi.input_value(timeout=800).strip()
             if val == date_str_ddmmyyyy:
@@ -1090,41 +1178,34 @@ def _set_date_in_picker(frame, date_str_ddmmyyyy: str) -> None:
             now = datetime.now()
             cur_year, cur_month = now.year, now.month
 
-        prev_btn = cont.locator(
-            "th.prev, .ui-datepicker-prev, button[aria-label*='Prev' i], button[aria-label*='Anterior' i]"
-        ).first
-        next_btn = cont.locator(
-            "th.next, .ui-datepicker-next, button[aria-label*='Next' i], button[aria-label*='Siguiente' i]"
-        ).first
-
         months_diff = (target_year - cur_year) * 12 + (target_month - cur_month)
 
         if months_diff != 0:
-            btn = next_btn if months_diff > 0 else prev_btn
-            for _ in range(abs(months_diff)):
-                try:
-                    btn.click(force=True)
-                except Exception:
-                    prev_btn = cont.locator(
-                        "th.prev, .ui-datepicker-prev, button[aria-label*='Prev' i], button[aria-label*='Anterior' i]"
-                    ).first
-                    next_btn = cont.locator(
-                        "th.next, .ui-datepicker-next, button[aria-label*='Next' i], button[aria-label*='Siguiente' i]"
-                    ).first
-                    btn = next_btn if months_diff > 0 else prev_btn
-                    btn.click(force=True)
+            # Todos los clicks Prev/Next en un solo evaluate; el botón se vuelve a buscar
+            # en cada vuelta porque algunos datepickers re-renderizan el encabezado.
+            nav_css = _CSS_DP_NEXT if months_diff > 0 else _CSS_DP_PREV
+            try:
+                done = int(cont.evaluate(_JS_DP_NAVIGATE, [nav_css, abs(months_diff)]) or 0)
+            except Exception:
+                done = 0
+            for _ in range(abs(months_diff) - done):
+                cont.locator(nav_css).first.click(force=True)
                 frame.wait_for_timeout(60)
 
-        day_css = f"td.day:not(.old):not(.new):has-text('{target_day}')"
-        try:
-            if cont.locator(day_css).count():
-                cont.locator(day_css).first.click(force=True)
-            else:
-                cont.locator(
-                    f"//td[normalize-space()='{target_day}' and not(contains(@class,'old')) and not(contains(@class,'new'))]"
-                ).first.click(force=True)
-        except Exception:
-            pass
+        # Días del mes visible: se leen todos de una vez y se clickea por índice
+        day_clicked = False
+        for day_css in _CSS_DP_DAYS:
+            try:
+                cells = cont.locator(day_css)
+                texts = [t.strip() for t in cells.all_inner_texts()]
+                if str(target_day) in texts:
+                    cells.nth(texts.index(str(target_day))).click(force=True)
+                    day_clicked = True
+                    break
+            except Exception as e:
+                print(f"[CEP] Datepicker: fallo al clickear el día con {day_css!r}:", repr(e))
+        if not day_clicked:
+            print(f"[CEP] Datepicker: no se encontró el día {target_day}; se fuerza el valor del input")
 
         try:
             val = fi.input_value(timeout=800).strip()
@@ -1140,21 +1221,17 @@ def _set_date_in_picker(frame, date_str_ddmmyyyy: str) -> None:
 
 def _find_form_frame(page):
     try:
-        targets = [
-            re.compile(r"Fecha.*realiz[oó]\s+el\s+pago", re.I),
-            re.compile(r"Criterio\s+de\s+b[uú]squeda", re.I),
-            re.compile(r"Clave\s+de\s+rastreo|N[uú]mero\s+de\s+referencia", re.I),
-        ]
-        for fr in page.frames:
-            ok = 0
+        targets = [RE_LBL_FECHA_PAGO, RE_LBL_CRITERIO, RE_LBL_CLAVE_O_REF]
+        main = page.main_frame
+        # El frame principal es el caso habitual: se revisa primero.
+        # Basta con una etiqueta encontrada para quedarnos con el frame.
+        for fr in [main] + [f for f in page.frames if f is not main]:
             for rx in targets:
                 try:
                     if fr.get_by_label(rx).first.count():
-                        ok += 1
+                        return fr
                 except Exception:
                     pass
-            if ok:
-                return fr
     except Exception:
         pass
     return page.main_frame
@@ -1171,171 +1248,238 @@ def _option_select_by_text(frame, select_locator: str, option_text: Optional[str
     except Exception:
         pass
     try:
-        for o in frame.locator(select_locator + " option").all():
-            t = (o.inner_text() or "").strip().upper()
-            if option_text.upper() in t:
-                val = o.get_attribute("value") or ""
-                frame.locator(select_locator).select_option(value=val)
+        # textos y valores en dos viajes al navegador (no 2 por cada <option>)
+        opts = frame.locator(select_locator + " option")
+        texts = opts.all_inner_texts()
+        values = opts.evaluate_all("els => els.map(e => e.value)")
+        wanted = option_text.upper()
+        for t, val in zip(texts, values):
+            if wanted in (t or "").strip().upper():
+                frame.locator(select_locator).select_option(value=val or "")
                 break
     except Exception:
         pass
 
-def download_cep(job: CepJob, target_dir: Path, headless: bool = True, slowmo: int = 0) -> Optional[Path]:
+def _chromium_launch_args(headless: bool, slowmo: int = 0) -> Dict:
+    # Argumentos para ejecutar en servidor sin GUI
+    launch_args = {
+        "headless": headless,
+        "slow_mo": slowmo,
+    }
+
+    # Si es headless, agregar argumentos adicionales para evitar errores en servidores sin X
+    # y para evadir detección de bots
+    if headless:
+        launch_args["args"] = [
+            "--no-sandbox",
+            "--disable-setuid-sandbox",
+            "--disable-dev-shm-usage",
+            "--disable-gpu",
+            "--disable-blink-features=AutomationControlled",  # Evitar detección de automation
+        ]
+    return launch_args
+
+def _new_cep_context(browser):
+    # Contexto del navegador con configuración más "humana"
+    ctx = browser.new_context(
+        accept_downloads=True,
+        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        viewport={"width": 1920, "height": 1080},
+        locale="es-MX",
+        timezone_id="America/Mexico_City",
+        extra_http_headers={
+            "Accept-Language": "es-MX,es;q=0.9,en;q=0.8",
+        }
+    )
+
+    # Helper JS de selección de banco: se parsea una vez por documento/iframe
+    ctx.add_init_script(script=_JS_PICK_OPTION)
+
+    # No descargamos imágenes de otros dominios, fuentes/media ni analítica
+    # (CEP_BLOCK_RESOURCES=0 lo desactiva)
+    if os.getenv("CEP_BLOCK_RESOURCES", "1") == "1":
+        ctx.route("**/*", _route_block_heavy)
+    return ctx
+
+_BLOCKED_RESOURCE_TYPES = frozenset({"font", "media"})
+_BLOCKED_HOSTS = ("google-analytics.com", "googletagmanager.com", "doubleclick.net", "hotjar.com")
+_CEP_HOST = "banxico.org.mx"
+
+def _route_block_heavy(route) -> None:
     """
-    Llena el formulario y descarga el CEP (PDF).
-    Campos mínimos:
-      - fecha dd-mm-YYYY
-      - (clave de rastreo) o (número de referencia)
-      - CLABE beneficiaria de 18 dígitos
-      - monto > 0
+    Aborta recursos que no aportan al formulario. El CSS se deja pasar (las
+    comprobaciones :visible del datepicker dependen de él) y también todas las
+    imágenes de Banxico: el captcha no siempre trae "captcha" en la URL y se
+    necesita visible para resolverlo a mano y para el screenshot de _handle_captcha.
     """
-    from playwright.sync_api import sync_playwright, TimeoutError as PWTimeout
+    req = route.request
+    host = (urlsplit(req.url).hostname or "").lower()
+    on_host = host == _CEP_HOST or host.endswith("." + _CEP_HOST)
+    if (
+        any(host == h or host.endswith("." + h) for h in _BLOCKED_HOSTS)
+        or req.resource_type in _BLOCKED_RESOURCE_TYPES
+        or (req.resource_type == "image" and not on_host)
+    ):
+        route.abort()
+    else:
+        route.continue_()
 
+def _cep_out_path(job: CepJob, target_dir: Path) -> Path:
     target_dir.mkdir(parents=True, exist_ok=True)
     keyname = job.clave_rastreo or job.numero_referencia or "SINCLAVE"
-    out_path = target_dir / f"{job.fecha}_{keyname[:24]}_{job.monto:.2f}.pdf"
+    return target_dir / f"{job.fecha}_{keyname[:24]}_{job.monto:.2f}.pdf"
 
-    with sync_playwright() as p:
-        # Argumentos para ejecutar en servidor sin GUI
-        launch_args = {
-            "headless": headless,
-            "slow_mo": slowmo,
-        }
-        
-        # Si es headless, agregar argumentos adicionales para evitar errores en servidores sin X
-        # y para evadir detección de bots
-        if headless:
-            launch_args["args"] = [
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-                "--disable-dev-shm-usage",
-                "--disable-gpu",
-                "--disable-blink-features=AutomationControlled",  # Evitar detección de automation
-            ]
-        
-        browser = p.chromium.launch(**launch_args)
-        
-        # Contexto del navegador con configuración más "humana"
-        ctx = browser.new_context(
-            accept_downloads=True,
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            viewport={"width": 1920, "height": 1080},
-            locale="es-MX",
-            timezone_id="America/Mexico_City",
-            extra_http_headers={
-                "Accept-Language": "es-MX,es;q=0.9,en;q=0.8",
-            }
-        )
-        
-        page = ctx.new_page()
-        page.set_default_timeout(35000)
-        
-        # Agregar delay aleatorio entre 1-3 segundos al inicio para parecer más humano
-        import random
-        initial_delay = random.uniform(1000, 3000)
-        page.wait_for_timeout(int(initial_delay))
+def _new_cep_page(ctx):
+    page = ctx.new_page()
+    page.set_default_timeout(35000)
+    return page
+
+def download_cep_on_page(page, job: CepJob, target_dir: Path, headless: bool = True) -> Optional[Path]:
+    """
+    Igual que download_cep, pero sobre una pestaña ya abierta (se reutiliza
+    navegador + pestaña entre movimientos; cada movimiento solo re-navega).
+    """
+    from playwright.sync_api import TimeoutError as PWTimeout
 
-        # AUTO-SAVE por si abre en popup o se hace click manual
-        import time as _time
-        saved_flag = {"done": False}
+    out_path = _cep_out_path(job, target_dir)
+    ctx = page.context
 
-        def _auto_save(download):
-            try:
-                dest = out_path if not saved_flag["done"] else out_path.with_name(
-                    f"{out_path.stem}__{int(_time.time())}.pdf"
-                )
-                download.save_as(str(dest))
-                saved_flag["done"] = True
-                print("[CEP] PDF guardado en:", dest)
-            except Exception as e:
-                print("[CEP] Error al auto-guardar:", e)
+    # Agregar delay aleatorio entre 1-3 segundos al inicio para parecer más humano
+    import random
+    initial_delay = random.uniform(1000, 3000)
+    page.wait_for_timeout(int(initial_delay))
 
-        ctx.on("download", _auto_save)
+    # AUTO-SAVE por si abre en popup o se hace click manual
+    import time as _time
+    saved_flag = {"done": False}
 
+    def _auto_save(download):
         try:
-            page.goto("https://www.banxico.org.mx/cep/", wait_until="domcontentloaded")
+            dest = out_path if not saved_flag["done"] else out_path.with_name(
+                f"{out_path.stem}__{int(_time.time())}.pdf"
+            )
+            download.save_as(str(dest))
+            saved_flag["done"] = True
+            print("[CEP] PDF guardado en:", dest)
+        except Exception as e:
+            print("[CEP] Error al auto-guardar:", e)
 
-            try:
-                page.get_by_role("button", name=re.compile("Aceptar|De acuerdo|OK", re.I)).click(timeout=3000)
-            except Exception:
-                pass
+    ctx.on("download", _auto_save)
 
-            frm = _find_form_frame(page)
+    try:
+        page.goto("https://www.banxico.org.mx/cep/", wait_until="domcontentloaded")
 
-            _set_date_in_picker(frm, job.fecha)
+        try:
+            page.get_by_role("button", name=RE_BTN_ACEPTAR).click(timeout=3000)
+        except Exception:
+            pass
 
-            crit_select = 'select[name*="criterio"]'
-            if job.clave_rastreo:
-                _option_select_by_text(frm, crit_select, "Clave de rastreo")
-                frm.get_by_label(re.compile(r"(Clave|N[uú]mero)\s+de\s+(rastreo|referencia)", re.I)).fill(job.clave_rastreo)
-            else:
-                _option_select_by_text(frm, crit_select, "Número de referencia")
-                frm.get_by_label(re.compile(r"(Clave|N[uú]mero)\s+de\s+(rastreo|referencia)", re.I)).fill(job.numero_referencia or "")
+        frm = _find_form_frame(page)
 
-            _select_option_by_label_loose(
-                frm, re.compile(r"Instituci[oó]n\s+emisora\s+del\s+pago", re.I),
-                job.banco_emisor, role_hint="emisora"
-            )
-            _select_option_by_label_loose(
-                frm, re.compile(r"Instituci[oó]n\s+receptora\s+del\s+pago", re.I),
-                job.banco_receptor, role_hint="receptora"
-            )
-            # Fallback directo por IDs nativos de Banxico (del HTML compartido)
-            try:
-                if job.banco_emisor:
-                    sel = frm.locator("#input_emisor")
-                    if sel and sel.count():
-                        sel.select_option(label=job.banco_emisor)
-            except Exception:
-                pass
+        _set_date_in_picker(frm, job.fecha)
 
-            try:
-                if job.banco_receptor:
-                    sel = frm.locator("#input_receptor")
-                    if sel and sel.count():
-                        sel.select_option(label=job.banco_receptor)
-            except Exception:
-                pass
-        
+        crit_select = 'select[name*="criterio"]'
+        if job.clave_rastreo:
+            _option_select_by_text(frm, crit_select, "Clave de rastreo")
+            frm.get_by_label(RE_LBL_CLAVE_REF).fill(job.clave_rastreo)
+        else:
+            _option_select_by_text(frm, crit_select, "Número de referencia")
+            frm.get_by_label(RE_LBL_CLAVE_REF).fill(job.numero_referencia or "")
 
-            frm.wait_for_timeout(1200)
+        _select_option_by_label_loose(
+            frm, RE_LBL_EMISORA,
+            job.banco_emisor, role_hint="emisora"
+        )
+        _select_option_by_label_loose(
+            frm, RE_LBL_RECEPTORA,
+            job.banco_receptor, role_hint="receptora"
+        )
+        # Fallback directo por IDs nativos de Banxico (del HTML compartido)
+        try:
+            if job.banco_emisor:
+                sel = frm.locator("#input_emisor")
+                if sel and sel.count():
+                    sel.select_option(label=job.banco_emisor)
+        except Exception:
+            pass
 
-            if job.cuenta_beneficiaria:
-                frm.get_by_label(re.compile(r"Cuenta\s+Beneficiaria", re.I)).fill(job.cuenta_beneficiaria)
+        try:
+            if job.banco_receptor:
+                sel = frm.locator("#input_receptor")
+                if sel and sel.count():
+                    sel.select_option(label=job.banco_receptor)
+        except Exception:
+            pass
 
-            monto_input = frm.get_by_label(re.compile(r"Monto\s+del\s+pago", re.I))
-            monto_input.fill(f"{float(job.monto):.2f}")
-            try:
-                monto_input.evaluate("""
-                    el => {
-                        el.dispatchEvent(new Event('input',{bubbles:true}));
-                        el.dispatchEvent(new Event('change',{bubbles:true}));
-                        if (el.blur) el.blur();
-                    }
-                """)
-            except Exception:
-                pass
+        # En vez de dormir 1.2 s: esperamos a que el campo de monto esté habilitado
+        try:
+            frm.wait_for_function(_JS_MONTO_READY, timeout=5000)
+        except Exception:
+            pass
 
-            frm.wait_for_timeout(1200)
+        if job.cuenta_beneficiaria:
+            frm.get_by_label(RE_LBL_CUENTA_BENEF).fill(job.cuenta_beneficiaria)
 
-            if not _handle_captcha(frm, page, out_path.parent, headless=headless):
-                print("[CEP] Captcha no resuelto (headless). Saltando este movimiento.")
-                return None
+        monto_input = frm.get_by_label(RE_LBL_MONTO)
+        monto_input.fill(f"{float(job.monto):.2f}")
+        try:
+            monto_input.evaluate("""
+                el => {
+                    el.dispatchEvent(new Event('input',{bubbles:true}));
+                    el.dispatchEvent(new Event('change',{bubbles:true}));
+                    if (el.blur) el.blur();
+                }
+            """)
+        except Exception:
+            pass
 
-            pth = _click_descargar_y_bajar_pdf(page, frm, out_path)
-            return pth
+        # ...y a que el botón de descarga esté en pantalla
+        try:
+            frm.wait_for_selector(_CSS_BTN_DESCARGAR, state="visible", timeout=5000)
+        except Exception:
+            pass
 
-        except PWTimeout:
-            return None
-        except Exception as e:
-            print("[CEP] Excepción en download_cep:", repr(e))
+        if not _handle_captcha(frm, page, out_path.parent, headless=headless):
+            print("[CEP] Captcha no resuelto (headless). Saltando este movimiento.")
             return None
+
+        pth = _click_descargar_y_bajar_pdf(page, frm, out_path)
+        return pth
+
+    except PWTimeout:
+        return None
+    except Exception as e:
+        print("[CEP] Excepción en download_cep:", repr(e))
+        return None
+    finally:
+        try:
+            if not headless and os.getenv("CEP_DEBUG_KEEP", "0") == "1":
+                page.wait_for_timeout(8000)
+        except Exception:
+            pass
+        # El contexto se reutiliza: quitamos el handler de este movimiento
+        try:
+            ctx.remove_listener("download", _auto_save)
+        except Exception:
+            pass
+
+def download_cep(job: CepJob, target_dir: Path, headless: bool = True, slowmo: int = 0) -> Optional[Path]:
+    """
+    Llena el formulario y descarga el CEP (PDF).
+    Campos mínimos:
+      - fecha dd-mm-YYYY
+      - (clave de rastreo) o (número de referencia)
+      - CLABE beneficiaria de 18 dígitos
+      - monto > 0
+    """
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(**_chromium_launch_args(headless, slowmo))
+        ctx = _new_cep_context(browser)
+        try:
+            return download_cep_on_page(_new_cep_page(ctx), job, target_dir, headless=headless)
         finally:
-            try:
-                if not headless and os.getenv("CEP_DEBUG_KEEP", "0") == "1":
-                    page.wait_for_timeout(8000)
-            except Exception:
-                pass
             ctx.close()
             browser.close()
 
@@ -1343,33 +1487,55 @@ def download_cep(job: CepJob, target_dir: Path, headless: bool = True, slowmo: i
 # Escribir hipervínculos y generar ZIP (con CSV de log)
 # -------------------------------------------------------------------
 def _add_links_to_excel(xlsx_in: str, xlsx_out: str, jobs: List[CepJob], pdf_paths: Dict[Tuple[str, int], Path]) -> None:
+    # Links agrupados por hoja de antemano: {hoja: [(fila_excel, ruta_relativa), ...]}
+    links_by_sheet: Dict[str, List[Tuple[int, str]]] = {}
+    for j in jobs:
+        pdf = pdf_paths.get((j.sheet, j.row_index))
+        if pdf:
+            rel = Path("ceps") / j.sheet / pdf.name
+            links_by_sheet.setdefault(j.sheet, []).append((j.row_index + 2, str(rel)))
+
     wb = load_workbook(xlsx_in)
     for sheet_name in list(wb.sheetnames):
         ws = wb[sheet_name]
         cep_col_idx = ws.max_column + 1
-        ws.cell(row=1, column=cep_col_idx, value="CEP")
-        for j in jobs:
-            if j.sheet != sheet_name:
-                continue
-            pdf = pdf_paths.get((j.sheet, j.row_index))
-            if not pdf:
-                continue
-            excel_row = j.row_index + 2
-            rel = Path("ceps") / j.sheet / pdf.name
-            c = ws.cell(row=excel_row, column=cep_col_idx)
-            c.value = "Abrir CEP"
-            c.hyperlink = str(rel)
+        hdr = ws.cell(row=1, column=cep_col_idx, value="CEP")
+        for excel_row, rel in sorted(links_by_sheet.get(sheet_name, ())):
+            c = ws.cell(row=excel_row, column=cep_col_idx, value="Abrir CEP")
+            c.hyperlink = rel
             c.style = "Hyperlink"
-        ws.column_dimensions[get_column_letter(cep_col_idx)].width = 14
+        ws.column_dimensions[hdr.column_letter].width = 14
     wb.save(xlsx_out)
 
+_ZIP_READ_WORKERS = min(8, os.cpu_count() or 1)
+
 def _zip_package(zip_path: str, excel_path: str, ceps_root: Path) -> None:
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+    # Los PDF ya traen sus streams comprimidos: se guardan sin DEFLATE;
+    # el resto con nivel 1 (rápido).
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as z:
         z.write(excel_path, arcname=Path(excel_path).name)
         if ceps_root.exists():
-            for p in ceps_root.rglob("*.pdf"):
-                arc = Path("ceps") / p.relative_to(ceps_root)
-                z.write(p, arcname=str(arc))
+            # Lectura de PDFs en hilos (ventana acotada de archivos en memoria) mientras
+            # el hilo principal escribe en el ZIP, en el mismo orden.
+            from collections import deque
+            from concurrent.futures import ThreadPoolExecutor
+            pdfs = iter(sorted(ceps_root.rglob("*.pdf")))
+            window = 2 * _ZIP_READ_WORKERS
+            with ThreadPoolExecutor(max_workers=_ZIP_READ_WORKERS) as ex:
+                pending = deque()
+                for p in pdfs:
+                    pending.append((p, ex.submit(p.read_bytes)))
+                    if len(pending) >= window:
+                        break
+                while pending:
+                    p, fut = pending.popleft()
+                    nxt = next(pdfs, None)
+                    if nxt is not None:
+                        pending.append((nxt, ex.submit(nxt.read_bytes)))
+                    arc = Path("ceps") / p.relative_to(ceps_root)
+                    zi = zipfile.ZipInfo.from_file(p, arcname=str(arc))
+                    zi.compress_type = zipfile.ZIP_STORED
+                    z.writestr(zi, fut.result())
             log_csv = ceps_root / "_descargas_cep.csv"
             if log_csv.exists():
                 z.write(log_csv, arcname=str(Path("ceps") / "_descargas_cep.csv"))
@@ -1395,7 +1561,7 @@ def build_zip_with_ceps_from_xlsx(xlsx_path: str, zip_out: str, headless: bool =
 
         if jobs:
             try:
-                from playwright.sync_api import sync_playwright  # noqa
+                from playwright.sync_api import sync_playwright  # lo usan los workers
             except Exception:
                 raise RuntimeError(
                     "Playwright no está instalado.\n"
@@ -1403,9 +1569,10 @@ def build_zip_with_ceps_from_xlsx(xlsx_path: str, zip_out: str, headless: bool =
                     "  playwright install --with-deps chromium"
                 )
 
+            pending: List[CepJob] = []
             for j in jobs:
                 clabe = (j.cuenta_beneficiaria or "").strip()
-                if not re.fullmatch(r"\d{18}", clabe):
+                if not (len(clabe) == 18 and clabe.isascii() and clabe.isdigit()):
                     w.writerow([j.sheet, j.row_index, j.fecha, j.monto, j.clave_rastreo or "", j.numero_referencia or "", "skip", "missing_clabe_18d"])
                     continue
                 if not (j.clave_rastreo or j.numero_referencia):
@@ -1414,25 +1581,100 @@ def build_zip_with_ceps_from_xlsx(xlsx_path: str, zip_out: str, headless: bool =
                 if not j.monto or float(j.monto) <= 0:
                     w.writerow([j.sheet, j.row_index, j.fecha, j.monto, j.clave_rastreo or "", j.numero_referencia or "", "skip", "missing_amount"])
                     continue
-
-                target = ceps_root / j.sheet
-                target.mkdir(parents=True, exist_ok=True)
-                try:
-                    pth = download_cep(j, target, headless=headless)
-                    if pth and pth.exists():
+                pending.append(j)
+
+            # Descargas concurrentes: cada worker tiene su
+            # propio Playwright/navegador/contexto/pestaña (la API sync de Playwright no se
+            # comparte entre hilos) y lo reutiliza para todos los movimientos de la cola.
+            import queue, random, threading, time
+            from concurrent.futures import ThreadPoolExecutor
+
+            lock = threading.Lock()
+            job_q: "queue.Queue[CepJob]" = queue.Queue()
+            for j in pending:
+                job_q.put(j)
+
+            def _record(j: CepJob, status: str, detalle: str, pth: Optional[Path] = None) -> None:
+                nonlocal ok
+                with lock:
+                    if pth is not None:
                         ok += 1
                         pdf_by_row[(j.sheet, j.row_index)] = pth
-                        w.writerow([j.sheet, j.row_index, j.fecha, j.monto, j.clave_rastreo or "", j.numero_referencia or "", "ok", pth.name])
-                    else:
-                        w.writerow([j.sheet, j.row_index, j.fecha, j.monto, j.clave_rastreo or "", j.numero_referencia or "", "fail", "button_disabled_or_timeout"])
-                    
-                    # Delay aleatorio entre movimientos (2-5 segundos) para evitar detección de bot
-                    import random, time
-                    delay = random.uniform(2.0, 5.0)
-                    time.sleep(delay)
-                    
-                except Exception as e:
-                    w.writerow([j.sheet, j.row_index, j.fecha, j.monto, j.clave_rastreo or "", j.numero_referencia or "", "fail", repr(e)])
+                    w.writerow([j.sheet, j.row_index, j.fecha, j.monto, j.clave_rastreo or "", j.numero_referencia or "", status, detalle])
+
+            def _worker() -> None:
+                pw = browser = ctx = page = None
+                try:
+                    while True:
+                        try:
+                            j = job_q.get_nowait()
+                        except queue.Empty:
+                            return
+                        try:
+                            # El navegador se levanta con el primer movimiento del worker
+                            if ctx is None:
+                                try:
+                                    pw = sync_playwright().start()
+                                    browser = pw.chromium.launch(**_chromium_launch_args(headless))
+                                    ctx = _new_cep_context(browser)
+                                except Exception as e:
+                                    # Worker muerto: no se reintenta el arranque (un segundo
+                                    # sync_playwright() en el mismo hilo también fallaría).
+                                    # Su movimiento vuelve a la cola para otro worker.
+                                    print("[CEP] No se pudo iniciar el navegador en este worker:", repr(e))
+                                    job_q.put(j)
+                                    return
+                            # Una sola pestaña por worker; se recrea si se cerró o crasheó
+                            if page is None or page.is_closed():
+                                page = _new_cep_page(ctx)
+                            try:
+                                pth = download_cep_on_page(page, j, ceps_root / j.sheet, headless=headless)
+                            except Exception:
+                                try:
+                                    page.close()
+                                except Exception:
+                                    pass
+                                page = None
+                                raise
+                            if pth and pth.exists():
+                                _record(j, "ok", pth.name, pth)
+                            else:
+                                _record(j, "fail", "button_disabled_or_timeout")
+
+                            # Delay aleatorio entre movimientos (2-5 segundos) para evitar detección de bot
+                            delay = random.uniform(2.0, 5.0)
+                            time.sleep(delay)
+
+                        except Exception as e:
+                            _record(j, "fail", repr(e))
+                finally:
+                    for closable in (ctx, browser):
+                        try:
+                            if closable is not None:
+                                closable.close()
+                        except Exception:
+                            pass
+                    if pw is not None:
+                        try:
+                            pw.stop()
+                        except Exception:
+                            pass
+
+            # En modo visible (captcha manual por consola) solo un worker
+            n_workers = max(1, int(os.getenv("CEP_PARALLEL", "4"))) if headless else 1
+            n_workers = min(n_workers, len(pending))
+            if n_workers:
+                with ThreadPoolExecutor(max_workers=n_workers) as ex:
+                    futures = [ex.submit(_worker) for _ in range(n_workers)]
+                for fut in futures:
+                    try:
+                        fut.result()
+                    except Exception as e:
+                        print("[CEP] Worker terminó con error:", repr(e))
+
+            # Movimientos que ningún worker pudo tomar (p. ej. falló el arranque del navegador)
+            while not job_q.empty():
+                _record(job_q.get_nowait(), "fail", "worker_error")
         else:
             pdf_by_row = {}
             ok = 0
@@ -2,6 +2,18 @@
 import pdfplumber
 from openpyxl import Workbook
 
+# xlsxwriter en modo constant_memory (escribe fila por fila a disco); opcional
+try:
+    import xlsxwriter  # pip install xlsxwriter
+except Exception:
+    xlsxwriter = None
+
+# PyMuPDF para la vista previa de texto (más rápido); opcional
+try:
+    import fitz  # pip install pymupdf
+except Exception:
+    fitz = None
+
 def extract_banorte_to_xlsx(pdf_path: str, out_xlsx: str) -> None:
     """
     Mínimo funcional para probar el pipeline.
@@ -11,26 +23,49 @@ def extract_banorte_to_xlsx(pdf_path: str, out_xlsx: str) -> None:
     # Leer primeras líneas del PDF (solo para demo)
     first_lines = []
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            if pdf.pages:
-                txt = (pdf.pages[0].extract_text() or "").replace("\u00a0", " ")
-                first_lines = [ln for ln in txt.splitlines() if ln.strip()][:15]
+        txt = ""
+        if fitz is not None:
+            with fitz.open(pdf_path) as doc:
+                if doc.page_count:
+                    txt = doc[0].get_text("text", sort=True) or ""
+        else:
+            with pdfplumber.open(pdf_path) as pdf:
+                if pdf.pages:
+                    txt = pdf.pages[0].extract_text() or ""
+        txt = txt.replace("\u00a0", " ")
+        first_lines = [ln for ln in txt.splitlines() if ln.strip()][:15]
     except Exception:
         first_lines = ["(No pude leer texto del PDF)"]
 
     # Crear Excel de ejemplo
+    info_rows = [["campo", "valor"], ["origen_pdf", pdf_path]]
+    info_rows += [[f"linea_{i}", ln] for i, ln in enumerate(first_lines, start=1)]
+    movs_rows = [
+        ["date", "description", "deposits", "withdrawals", "balance"],
+        # Rellena filas de ejemplo (para verificar columnas)
+        ["2024-08-01", "DEMO: Movimiento 1", 0, 100.50, 9900.00],
+        ["2024-08-02", "DEMO: Movimiento 2", 2500.00, 0, 12400.00],
+    ]
+
+    if xlsxwriter is not None:
+        wb = xlsxwriter.Workbook(out_xlsx, {"constant_memory": True})
+        try:
+            for name, rows in (("info", info_rows), ("movs", movs_rows)):
+                ws = wb.add_worksheet(name)
+                for r, row in enumerate(rows):
+                    ws.write_row(r, 0, row)
+        finally:
+            wb.close()
+        return
+
     wb = Workbook()
     ws_info = wb.active
     ws_info.title = "info"
-    ws_info.append(["campo", "valor"])
-    ws_info.append(["origen_pdf", pdf_path])
-    for i, ln in enumerate(first_lines, start=1):
-        ws_info.append([f"linea_{i}", ln])
+    for row in info_rows:
+        ws_info.append(row)
 
     ws_movs = wb.create_sheet("movs")
-    ws_movs.append(["date", "description", "deposits", "withdrawals", "balance"])
-    # Rellena filas de ejemplo (para verificar columnas)
-    ws_movs.append(["2024-08-01", "DEMO: Movimiento 1", 0, 100.50, 9900.00])
-    ws_movs.append(["2024-08-02", "DEMO: Movimiento 2", 2500.00, 0, 12400.00])
+    for row in movs_rows:
+        ws_movs.append(row)
 
     wb.save(out_xlsx)
@@ -4,18 +4,33 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-import os, re, time, imaplib, email, ssl, datetime as dt
+import os, re, time, base64, quopri, imaplib, email, ssl, datetime as dt
 from dataclasses import dataclass
 from email.header import decode_header
 from html import unescape
 from typing import Optional, Tuple
 
-TOKEN_PATTERNS = [
-    re.compile(r"(?i)token(?:\s+de\s+verificaci[oó]n)?[:\s\-]*([A-Z0-9\-]{6,16})"),
-    re.compile(r"(?i)c[oó]digo(?:\s+de\s+verificaci[oó]n)?[:\s\-]*([A-Z0-9\-]{6,16})"),
-    re.compile(r"(?i)clave(?:\s+de\s+(?:verificaci[oó]n|acceso))?[:\s\-]*([A-Z0-9\-]{6,16})"),
-]
-GENERIC_CODE = re.compile(r"(?i)\b([A-Z0-9]{6,16})\b")
+# Regex con RE2 (tiempo lineal) si está instalado; si no, re
+from re_compat import rx as _rx
+
+# selectolax (parser HTML en C) para limpiar correos HTML; opcional
+try:
+    from selectolax.parser import HTMLParser  # pip install selectolax
+except Exception:
+    HTMLParser = None
+
+# token / código / clave (de verificación|acceso) en una sola pasada sobre el cuerpo;
+# el grupo con nombre indica qué palabra clave coincidió
+TOKEN_COMBINED = _rx(
+    r"(?i)(?:(?P<token>token(?:\s+de\s+verificaci[oó]n)?)"
+    r"|(?P<codigo>c[oó]digo(?:\s+de\s+verificaci[oó]n)?)"
+    r"|(?P<clave>clave(?:\s+de\s+(?:verificaci[oó]n|acceso))?))"
+    r"[:\s\-]*(?P<tok>[A-Z0-9\-]{6,16})"
+)
+# Prioridad por palabra clave: token > código > clave (sin importar el orden en el texto)
+TOKEN_KEYWORDS = ("token", "codigo", "clave")
+TOKEN_WINDOW = _rx(r"(?i)(token|c[oó]digo|clave)[^A-Z0-9]{0,30}([A-Z0-9]{6,16})")
+GENERIC_CODE = _rx(r"(?i)\b([A-Z0-9]{6,16})\b")
 
 @dataclass
 class ImapConfig:
@@ -80,22 +95,119 @@ def _msg_to_text(msg) -> str:
             texts.append(payload.decode(charset, errors="replace"))
         except Exception:
             pass
-    text = "\n\n".join(texts)
+    return _clean_body_text("\n\n".join(texts))
+
+def _clean_body_text(text: str) -> str:
     # Si es HTML, limpiar un poco
     if "<html" in text.lower():
-        text = re.sub(r"(?is)<script.*?</script>", " ", text)
-        text = re.sub(r"(?is)<style.*?</style>", " ", text)
-        text = re.sub(r"(?is)<[^>]+>", " ", text)
-        text = unescape(text)
+        if HTMLParser is not None:
+            tree = HTMLParser(text)
+            for tag in tree.css("script, style"):
+                tag.decompose()
+            text = tree.text(separator=" ") or ""  # ya decodifica entidades
+        else:
+            text = re.sub(r"(?is)<script.*?</script>", " ", text)
+            text = re.sub(r"(?is)<style.*?</style>", " ", text)
+            text = re.sub(r"(?is)<[^>]+>", " ", text)
+            text = unescape(text)
     return re.sub(r"\s+", " ", text).strip()
 
+# ---------- Lectura parcial: solo la parte de texto (sin adjuntos) ----------
+def _parse_bodystructure(buf: bytes):
+    """Convierte la respuesta BODYSTRUCTURE (S-expression IMAP) en listas anidadas de bytes/None."""
+    start = buf.upper().find(b"BODYSTRUCTURE")
+    if start < 0:
+        return None
+    i = buf.find(b"(", start)
+    if i < 0:
+        return None
+    stack: list = [[]]
+    n = len(buf)
+    while i < n:
+        c = buf[i:i+1]
+        if c == b"(":
+            stack.append([]); i += 1
+        elif c == b")":
+            top = stack.pop(); stack[-1].append(top); i += 1
+            if len(stack) == 1:
+                break
+        elif c in (b" ", b"\r", b"\n"):
+            i += 1
+        elif c == b'"':
+            j = i + 1; out = bytearray()
+            while j < n and buf[j:j+1] != b'"':
+                if buf[j:j+1] == b"\\":
+                    j += 1
+                out += buf[j:j+1]; j += 1
+            stack[-1].append(bytes(out)); i = j + 1
+        elif c == b"{":  # literal {n}
+            j = buf.index(b"}", i); size = int(buf[i+1:j]); k = j + 1
+            if buf[k:k+2] == b"\r\n":
+                k += 2
+            stack[-1].append(buf[k:k+size]); i = k + size
+        else:
+            j = i
+            while j < n and buf[j:j+1] not in (b" ", b"(", b")", b"\r", b"\n"):
+                j += 1
+            tok = buf[i:j]
+            stack[-1].append(None if tok.upper() == b"NIL" else tok); i = j
+    return stack[0][0] if stack[0] else None
+
+def _text_parts(bs, prefix: str = "") -> list[tuple[str, str, str, str]]:
+    """(sección, subtipo, encoding, charset) de cada parte text/* en orden."""
+    if not isinstance(bs, list) or not bs:
+        return []
+    if isinstance(bs[0], list):  # multipart: hijos primero, luego subtipo y extensiones
+        out = []
+        for n, child in enumerate(bs, start=1):
+            if not isinstance(child, list):
+                break
+            out += _text_parts(child, f"{prefix}{n}.")
+        return out
+    if len(bs) < 6 or (bs[0] or b"").upper() != b"TEXT":
+        return []
+    params = bs[2] if isinstance(bs[2], list) else []
+    kv = {(params[k] or b"").lower(): params[k+1] for k in range(0, len(params) - 1, 2)}
+    charset = (kv.get(b"charset") or b"utf-8").decode("ascii", "replace")
+    return [(prefix.rstrip(".") or "1", (bs[1] or b"").decode().lower(),
+             (bs[5] or b"7BIT").decode().upper(), charset)]
+
+def _fetch_body_text(M, i) -> Optional[str]:
+    """Texto del correo bajando solo su parte text/plain (o text/html); None si no se pudo."""
+    st, raw = M.fetch(i, '(BODYSTRUCTURE)')
+    if st != "OK" or not raw:
+        return None
+    buf = b"".join(b"".join(x) if isinstance(x, tuple) else (x or b"") for x in raw)
+    parts = _text_parts(_parse_bodystructure(buf))
+    part = next((p for p in parts if p[1] == "plain"), None) or next((p for p in parts if p[1] == "html"), None)
+    if not part:
+        return None
+    section, _, encoding, charset = part
+    st, raw = M.fetch(i, f'(BODY.PEEK[{section}])')
+    if st != "OK" or not raw or not isinstance(raw[0], tuple):
+        return None
+    payload = raw[0][1] or b""
+    if encoding == "BASE64":
+        payload = base64.b64decode(payload)
+    elif encoding == "QUOTED-PRINTABLE":
+        payload = quopri.decodestring(payload)
+    try:
+        text = payload.decode(charset, errors="replace")
+    except LookupError:
+        text = payload.decode("utf-8", errors="replace")
+    return _clean_body_text(text)
+
 def _extract_token(body_text: str) -> Optional[str]:
-    for pat in TOKEN_PATTERNS:
-        m = pat.search(body_text)
-        if m: return m.group(1).strip().upper()
+    best, best_rank = None, len(TOKEN_KEYWORDS)
+    for m in TOKEN_COMBINED.finditer(body_text):
+        rank = next(i for i, k in enumerate(TOKEN_KEYWORDS) if m.group(k) is not None)
+        if rank < best_rank:
+            best, best_rank = m, rank
+            if rank == 0:
+                break
+    if best: return best.group("tok").strip().upper()
     # fallback muy conservador: busca una palabra-código cerca de la palabra token
-    win = re.compile(r"(?i)(token|c[oó]digo|clave)[^A-Z0-9]{0,30}([A-Z0-9]{6,16})")
-    m = win.search(body_text)
+    m = TOKEN_WINDOW.search(body_text)
     if m: return m.group(2).strip().upper()
     # último recurso (podría dar falsos positivos): cualquier “código” de 6–16 chars
     m = GENERIC_CODE.search(body_text)
@@ -114,20 +226,51 @@ def _since_for_search(minutes: int) -> str:
     since_date = (dt.datetime.utcnow() - dt.timedelta(minutes=minutes)).strftime("%d-%b-%Y")
     return since_date
 
-def _search_ids(M, c: ImapConfig) -> list[str]:
+_SUBJECT_ALT_RE = re.compile(r"^(?:\(\?i\))?\(?([A-Za-z0-9 |]+)\)?$")
+
+def _subject_literals(subject_regex: str) -> Optional[list[str]]:
+    """Palabras si el regex es una alternancia simple tipo '(?i)(cep|token|banxico)'; si no, None."""
+    m = _SUBJECT_ALT_RE.match(subject_regex or "")
+    if not m or not subject_regex.startswith("(?i)"):
+        return None
+    words = [w.strip() for w in m.group(1).split("|")]
+    return words if all(words) else None
+
+def _search_criteria(c: ImapConfig) -> Tuple[list[str], bool]:
+    """Criterios SEARCH del lado del servidor y si ya cubren todo el filtro (sin revisar encabezados)."""
     criteria = ['SINCE', _since_for_search(c.lookback_minutes)]
-    # Filtro por FROM dominio si se puede
+    if c.sender_domain:
+        criteria += ['FROM', f'"{c.sender_domain}"']
+    words = _subject_literals(c.subject_regex)
+    if words:
+        # OR es binario en IMAP: OR OR SUBJECT a SUBJECT b SUBJECT c
+        criteria += ['OR'] * (len(words) - 1)
+        for w in words:
+            criteria += ['SUBJECT', f'"{w}"']
+    return criteria, words is not None
+
+def _search_ids(M, c: ImapConfig) -> list[str]:
+    criteria, server_only = _search_criteria(c)
     try:
-        status, data = M.search(None, 'SINCE', _since_for_search(c.lookback_minutes))
+        status, data = M.search(None, *criteria)
         if status != "OK": return []
-        # Filtra en cliente por remitente/subject
         ids = data[0].split()
+        if not ids: return []
+        if server_only:
+            return ids[::-1]  # más nuevos primero
+        # Filtra en cliente por remitente/subject
+        # Un solo FETCH para todos los ids, y solo los encabezados que se usan
+        st, raw = M.fetch(b",".join(ids), '(BODY.PEEK[HEADER.FIELDS (FROM SUBJECT)])')
+        if st != "OK": return []
+        headers: dict[bytes, bytes] = {}
+        for item in raw or []:
+            if isinstance(item, tuple) and len(item) >= 2:
+                headers[item[0].split(None, 1)[0]] = item[1] or b""
         out = []
         subj_re = re.compile(c.subject_regex)
         for i in ids[::-1]:  # más nuevos primero
-            st, raw = M.fetch(i, '(BODY.PEEK[HEADER])')
-            if st != "OK": continue
-            hdr = raw[0][1] if raw and raw[0] else b""
+            hdr = headers.get(i)
+            if hdr is None: continue
             msg = email.message_from_bytes(hdr)
             from_h = _decode_header_value(msg.get("From"))
             subj_h = _decode_header_value(msg.get("Subject"))
@@ -139,35 +282,55 @@ def _search_ids(M, c: ImapConfig) -> list[str]:
     except Exception:
         return []
 
+def _imap_logout(M) -> None:
+    if M is None:
+        return
+    try: M.logout()
+    except Exception: pass
+
 def wait_for_token(cfg: ImapConfig, *, timeout_seconds: Optional[int]=None, poll_interval: Optional[int]=None) -> Optional[str]:
     deadline = time.time() + (timeout_seconds or cfg.timeout_seconds)
     pi = poll_interval or cfg.poll_interval
     last_seen_ids: set[str] = set()
-    while time.time() < deadline:
-        try:
-            M = _imap_connect(cfg)
+    # Una sola sesión IMAP (TLS + LOGIN + SELECT) para todo el sondeo; se reabre solo si falla
+    M = None
+    try:
+        while time.time() < deadline:
             try:
+                if M is None:
+                    M = _imap_connect(cfg)
+                else:
+                    M.noop()  # mantiene viva la sesión y trae los correos nuevos
                 ids = _search_ids(M, cfg)
                 for i in ids:
                     if i in last_seen_ids: 
                         continue
-                    st, raw = M.fetch(i, '(RFC822)')
-                    if st != "OK": 
-                        continue
-                    msg = email.message_from_bytes(raw[0][1])
-                    body = _msg_to_text(msg)
+                    try:
+                        body = _fetch_body_text(M, i)
+                    except (imaplib.IMAP4.abort, OSError):
+                        raise
+                    except Exception:
+                        body = None
+                    if body is None:
+                        # sin BODYSTRUCTURE utilizable: correo completo
+                        st, raw = M.fetch(i, '(RFC822)')
+                        if st != "OK": 
+                            continue
+                        msg = email.message_from_bytes(raw[0][1])
+                        body = _msg_to_text(msg)
                     token = _extract_token(body)
                     if token:
                         return token
                     last_seen_ids.add(i)
-            finally:
-                try: M.logout()
-                except Exception: pass
-        except Exception:
-            # pequeño backoff
-            time.sleep(max(2, pi))
-            continue
-        time.sleep(pi)
+            except Exception:
+                # conexión caída: se descarta y se reconecta tras un pequeño backoff
+                _imap_logout(M)
+                M = None
+                time.sleep(max(2, pi))
+                continue
+            time.sleep(pi)
+    finally:
+        _imap_logout(M)
     return None
 
 # CLI rápido para probar conexión y extracción
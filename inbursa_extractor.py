@@ -1,18 +1,45 @@
 # inbursa_extractor.py
 from __future__ import annotations
-import os, re, math, unicodedata
+import os, re, math, functools, operator, unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 
+import numpy as np
 import pdfplumber
 import pandas as pd
 
+# Regex con RE2 (tiempo lineal) si está instalado; si no, re
+from re_compat import rx as _rx
+
+# PyMuPDF (mucho más rápido que pdfminer/pdfplumber); opcional
+try:
+    import fitz  # pip install pymupdf
+except Exception:
+    fitz = None
+
+# Escritor XLSX: xlsxwriter (más rápido, no crea objetos por celda) si está; si no, openpyxl
+try:
+    import xlsxwriter  # noqa: F401  pip install xlsxwriter
+    _XLSX_ENGINE = "xlsxwriter"
+except Exception:
+    _XLSX_ENGINE = "openpyxl"
+
 # ------------------------------ Utils ------------------------------
+WS_RX = re.compile(r"\s+")
+
+@functools.lru_cache(maxsize=4096)
 def _clean(s: str | None) -> str:
-    return re.sub(r"\s+", " ", (s or "")).strip()
+    return WS_RX.sub(" ", (s or "")).strip()
 
+@functools.lru_cache(maxsize=4096)
 def _norm(s: str | None) -> str:
-    s = unicodedata.normalize("NFD", s or "")
+    if not s:
+        return ""
+    if s.isascii():  # sin acentos: NFD no cambia nada
+        return s.upper()
+    s = unicodedata.normalize("NFD", s)
     s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
     return s.upper()
 
@@ -25,23 +52,59 @@ RX_MON_ONLY = re.compile(rf"^\s*({DATE_TOKEN})[\.,]?\s*$", re.I)
 RX_MON_DAY  = re.compile(rf"^\s*({DATE_TOKEN})[\.,]?\s+(\d{{1,2}})\s*$", re.I)
 RX_DAY_ONLY = re.compile(r"^\s*(\d{1,2})\s*$")
 
-AMOUNT_RX = re.compile(r"\d{1,3}(?:,\d{3})*\.\d{2}")
-ALPHA_RX  = re.compile(r"[A-Za-zÁÉÍÓÚÑáéíóúñ]")
-REF10_RX  = re.compile(r"\b(\d{10})\b")
+AMOUNT_RX = _rx(r"\d{1,3}(?:,\d{3})*\.\d{2}")
+ALPHA_RX  = _rx(r"[A-Za-zÁÉÍÓÚÑáéíóúñ]")
+REF10_RX  = _rx(r"\b(\d{10})\b")
 
+@functools.lru_cache(maxsize=8192)
 def _to_amount(s: str | None) -> Optional[float]:
     if not s:
         return None
     m = AMOUNT_RX.search(s)
     return float(m.group(0).replace(",", "")) if m else None
 
+# ---------------- Lectura del PDF (PyMuPDF o pdfplumber) ----------------
+@contextmanager
+def _open_pages(pdf_path: str):
+    """Abre el PDF una sola vez y entrega sus páginas (fitz si está disponible)."""
+    if fitz is not None:
+        doc = fitz.open(pdf_path)
+        try:
+            yield list(doc)
+        finally:
+            doc.close()
+    else:
+        with pdfplumber.open(pdf_path) as pdf:
+            yield pdf.pages
+
+def _page_text(page) -> str:
+    if fitz is not None and isinstance(page, fitz.Page):
+        return page.get_text("text", sort=True) or ""
+    return page.extract_text() or ""
+
+def _page_words(page) -> List[dict]:
+    """Palabras con las llaves de pdfplumber: x0, top, x1, bottom, text."""
+    if fitz is not None and isinstance(page, fitz.Page):
+        return [
+            {"x0": x0, "top": y0, "x1": x1, "bottom": y1, "text": t}
+            for x0, y0, x1, y1, t, *_ in page.get_text("words")
+        ]
+    return page.extract_words(x_tolerance=2.8, y_tolerance=2.8, use_text_flow=False) or []
+
 # ---------------- Encabezados (info / cuenta) ----------------
+PERIODO_RX = re.compile(
+    r"PERIODO\s+Del\s+(\d{1,2})\s+([A-Za-zÁÉÍÓÚÑ]{3,})\.?,?\s+(\d{4})\s+al\s+"
+    r"(\d{1,2})\s+([A-Za-zÁÉÍÓÚÑ]{3,})\.?,?\s+(\d{4})",
+    re.I
+)
+CUENTA_RX  = re.compile(r"\bCUENTA\s+(\d{6,})", re.I)
+CLABE_RX   = re.compile(r"\bCLABE\s+(\d{18})", re.I)
+MONEDA_RX  = re.compile(r"\bMONEDA\s+([A-Z]{3})", re.I)
+CLIENTE_RX = re.compile(r"Cliente\s+Inbursa:\s*(\d+)", re.I)
+RFC_RX     = re.compile(r"\bRFC:\s*([A-Z0-9]{12,13})", re.I)
+
 def _find_period(full_text: str) -> Tuple[Optional[str], Optional[str]]:
-    m = re.search(
-        r"PERIODO\s+Del\s+(\d{1,2})\s+([A-Za-zÁÉÍÓÚÑ]{3,})\.?,?\s+(\d{4})\s+al\s+"
-        r"(\d{1,2})\s+([A-Za-zÁÉÍÓÚÑ]{3,})\.?,?\s+(\d{4})",
-        full_text, re.I
-    )
+    m = PERIODO_RX.search(full_text)
     if not m:
         return None, None
     d1, m1, y1, d2, m2, y2 = m.groups()
@@ -56,11 +119,11 @@ def _find_period(full_text: str) -> Tuple[Optional[str], Optional[str]]:
     return _mk(d1, m1, y1), _mk(d2, m2, y2)
 
 def _parse_header_info(full_text: str) -> Dict[str, Optional[str]]:
-    m_acc = re.search(r"\bCUENTA\s+(\d{6,})", full_text, re.I)
-    m_cla = re.search(r"\bCLABE\s+(\d{18})", full_text, re.I)
-    m_cur = re.search(r"\bMONEDA\s+([A-Z]{3})", full_text, re.I)
-    m_cli = re.search(r"Cliente\s+Inbursa:\s*(\d+)", full_text, re.I)
-    m_rfc = re.search(r"\bRFC:\s*([A-Z0-9]{12,13})", full_text, re.I)
+    m_acc = CUENTA_RX.search(full_text)
+    m_cla = CLABE_RX.search(full_text)
+    m_cur = MONEDA_RX.search(full_text)
+    m_cli = CLIENTE_RX.search(full_text)
+    m_rfc = RFC_RX.search(full_text)
     p_ini, p_fin = _find_period(full_text)
     return {
         "account": m_acc.group(1) if m_acc else None,
@@ -85,18 +148,27 @@ FOOTER_TERMS = [
     "RENDIMIENTOS", "BANCO INBURSA", "REGIMEN FISCAL", "CLIENTE INBURSA"
 ]
 
-def _detect_header_centers(page) -> tuple[Optional[Dict[str, float]], float]:
-    words = page.extract_words(x_tolerance=2.8, y_tolerance=2.8, use_text_flow=False) or []
+def _group_by_y(words: List[dict], y_bin: float) -> Dict[int, List[dict]]:
+    """Agrupa palabras por renglón (top redondeado a y_bin); llaves en orden ascendente."""
+    if not words:
+        return {}
+    tops = np.fromiter((w["top"] for w in words), dtype=float, count=len(words))
+    keys = (np.round(tops / y_bin) * y_bin).astype(np.int64)
+    order = np.argsort(keys, kind="stable")  # conserva el orden original dentro del renglón
+    sk = keys[order]
+    starts = np.flatnonzero(np.r_[True, sk[1:] != sk[:-1]]).tolist()
+    ends = starts[1:] + [len(sk)]
+    idx = order.tolist()
+    return {int(sk[a]): [words[i] for i in idx[a:b]] for a, b in zip(starts, ends)}
+
+def _detect_header_centers(words: List[dict]) -> tuple[Optional[Dict[str, float]], float]:
     if not words:
         return None, 0.0
 
     targets = {"FECHA","REFERENCIA","CONCEPTO","DESCRIPCION","CARGOS","ABONOS","SALDO"}
 
     y_bin = 6
-    byline: Dict[int, List[dict]] = {}
-    for w in words:
-        key = round(w["top"] / y_bin) * y_bin
-        byline.setdefault(key, []).append(w)
+    byline = _group_by_y(words, y_bin)
 
     best_key, best_hits = None, -1
     for k, ws in byline.items():
@@ -142,26 +214,35 @@ def _build_xbands(centers: Dict[str, float]) -> Dict[str, tuple[float,float]]:
         bands[k] = (left, right)
     return bands
 
+_X0 = operator.itemgetter("x0")
+
 def _bucket_by_xbands(line_words: List[dict], bands: Dict[str, tuple[float,float]]) -> Dict[str, List[dict]]:
+    """line_words debe venir ordenado por x0; cada columna conserva ese orden."""
     out: Dict[str, List[dict]] = {k: [] for k in bands.keys()}
-    for w in sorted(line_words, key=lambda x: x["x0"]):
-        xmid = (w["x0"] + w["x1"]) / 2
-        for k, (lx, rx) in bands.items():
-            if lx <= xmid < rx:
-                out[k].append(w)
-                break
+    ws = line_words
+    if ws:
+        # Las bandas son contiguas y vienen ordenadas por x: basta con sus bordes izquierdos
+        keys = list(bands.keys())
+        edges = np.fromiter((lx for lx, _ in bands.values()), dtype=float, count=len(keys))
+        xmids = np.fromiter(((w["x0"] + w["x1"]) / 2 for w in ws), dtype=float, count=len(ws))
+        idx = np.searchsorted(edges, xmids, side="right") - 1
+        for w, i in zip(ws, idx.tolist()):
+            if i >= 0:
+                out[keys[i]].append(w)
 
     # REFERENCIA → deja sólo el ref de 10 dígitos; lo demás va a CONCEPTO
     if "REFERENCIA" in out and "CONCEPTO" in out:
         keep_ref, move_ref = [], []
         for w in out["REFERENCIA"]:
             t = _clean(w["text"])
-            if re.fullmatch(r"\d{10}", t):
+            if len(t) == 10 and t.isascii() and t.isdigit():
                 keep_ref.append(w)
             else:
                 move_ref.append(w)
         out["REFERENCIA"] = keep_ref
-        out["CONCEPTO"].extend(move_ref)
+        if move_ref:
+            out["CONCEPTO"].extend(move_ref)
+            out["CONCEPTO"].sort(key=_X0)
 
     # FECHA → mueve palabras/números largos que no son fecha real a CONCEPTO
     if "FECHA" in out and "CONCEPTO" in out:
@@ -170,46 +251,54 @@ def _bucket_by_xbands(line_words: List[dict], bands: Dict[str, tuple[float,float
             t = _clean(w["text"]); n = _norm(t)
             if RX_MON_DAY.match(n) or RX_MON_ONLY.match(n) or RX_DAY_ONLY.match(n):
                 keep_f.append(w)
-            elif ALPHA_RX.search(t) or re.fullmatch(r"\d{5,}", t):
+            elif ALPHA_RX.search(t) or (len(t) >= 5 and t.isascii() and t.isdigit()):
                 move_f.append(w)
             else:
                 keep_f.append(w)
         out["FECHA"] = keep_f
-        out["CONCEPTO"].extend(move_f)
+        if move_f:
+            out["CONCEPTO"].extend(move_f)
+            out["CONCEPTO"].sort(key=_X0)
 
     return out
 
 # ---------------- Normalización de “Descripción” ----------------
-INTERESES_RX = re.compile(r"\b(INTERESES\s+GANADOS|GANADOS\s+INTERESES)\b", re.I)
-BBVA_AFTER_MEXICO_RX = re.compile(r"\bMEXICO\s+(\d{6,})\s+BBVA\b", re.I)
+INTERESES_RX = _rx(r"\b(INTERESES\s+GANADOS|GANADOS\s+INTERESES)\b", re.I)
+BBVA_AFTER_MEXICO_RX = _rx(r"\bMEXICO\s+(\d{6,})\s+BBVA\b", re.I)
 EF_CORR_RX = re.compile(r"(?i)(EFECTIVO\s+CORRESPONSAL)\s+(Monterrey\s+NL\s+MX)\s+(Edison\s+\d+)")
 DOCTORES_MAYO_SWAP_RX = re.compile(r"(?i)\b(Doctores\s+Mayo)\s+(\d{4,})\b")
 BANK_NUMBER_FLIP_RX = re.compile(
     r"(?i)\b(\d{6,})\s+(BANAMEX|CITIBANAMEX|AZTECA|HSBC|SANTANDER|SCOTIABANK|BANORTE|BBVA(?:\s+MEXICO)?|NU(?:\s+MEXICO)?)\b"
 )
-TRACK_CODE_RX = re.compile(r"\b(MBAN[0-9A-Z]+|NU[0-9A-Z]+|\d{15,20})\b", re.I)
+TRACK_CODE_RX = _rx(r"\b(MBAN[0-9A-Z]+|NU[0-9A-Z]+|\d{15,20})\b", re.I)
+RASTREO_DE_RX  = _rx(r"\bDE\s+RASTREO\b", re.I)
+RASTREO_DUP_RX = re.compile(r"(CLAVE\s+DE\s+RASTREO\s+\S+)(?:\s+\1)+", re.I)
+RASTREO_KW_RX  = _rx(r"\bCLAVE\s+DE\s+RASTREO\b", re.I)
+CLAVE_TAIL_RX  = _rx(r"\bCLAVE\s*$", re.I)
+NU_PREFIX_RX   = re.compile(r"\bNU\s+(?=\d)", re.I)
+DEPOSITO_DUP_RX = re.compile(r"^\s*(DEPOSITO)\s+(?=\1\b)", re.I)
 
 def _inject_clave_rastreo(s: str) -> str:
     if not s:
         return s
-    s = re.sub(r"(?i)\bDE\s+RASTREO\b", "", s)
-    s = re.sub(r"(?i)(CLAVE\s+DE\s+RASTREO\s+\S+)(?:\s+\1)+", r"\1", s)
-    if re.search(r"(?i)\bCLAVE\s+DE\s+RASTREO\b", s):
-        s = re.sub(r"(?i)\bCLAVE\s*$", "", s)
+    s = RASTREO_DE_RX.sub("", s)
+    s = RASTREO_DUP_RX.sub(r"\1", s)
+    if RASTREO_KW_RX.search(s):
+        s = CLAVE_TAIL_RX.sub("", s)
         return _clean(s)
     last = None
     for m in TRACK_CODE_RX.finditer(s):
         last = m
     if last:
         s = s[:last.start()] + " CLAVE DE RASTREO " + s[last.start():]
-    s = re.sub(r"(?i)\bCLAVE\s*$", "", s)
+    s = CLAVE_TAIL_RX.sub("", s)
     return _clean(s)
 
 def _fix_bank_number_order(s: str) -> str:
     if not s:
         return s
     s = BANK_NUMBER_FLIP_RX.sub(lambda m: f"{m.group(2)} {m.group(1)}", s)
-    s = re.sub(r"(?i)\bNU\s+(?=\d)", "NU MEXICO ", s)
+    s = NU_PREFIX_RX.sub("NU MEXICO ", s)
     return _clean(s)
 
 def _normalize_concept_lines(lines: List[str]) -> str:
@@ -223,51 +312,51 @@ def _normalize_concept_lines(lines: List[str]) -> str:
     s = DOCTORES_MAYO_SWAP_RX.sub(r"\2 \1", s)
     s = _fix_bank_number_order(s)
     s = _inject_clave_rastreo(s)
-    s = re.sub(r"(?i)^\s*(DEPOSITO)\s+(?=\1\b)", r"\1 ", s)
+    s = DEPOSITO_DUP_RX.sub(r"\1 ", s)
 
     return _clean(s)
 
-ROW_START_RX = re.compile(
+ROW_START_RX = _rx(
     r"^\s*(?:DEPOSITO\s+(?:SPEI|EFECTIVO\s+CORRESPONSAL)|INTERESES\s+GANADOS|BALANCE\s+INICIAL)\b",
     re.I
 )
 
+MOV_COLS = ["Fecha","Referencia","Descripción","Cargos","Abonos","Saldo"]
+
 # ---------------- Parse de una página ----------------
-def _parse_page(page, year: int) -> List[Dict]:
-    centers, y_cut = _detect_header_centers(page)
+def _parse_page(words: List[dict], year: int) -> Dict[str, List]:
+    """Parsea las palabras (ya extraídas) de una página; columnas -> listas de valores."""
+    cols: Dict[str, List] = {c: [] for c in MOV_COLS}
+    centers, y_cut = _detect_header_centers(words)
     if not centers:
-        return []
+        return cols
 
-    words = page.extract_words(x_tolerance=2.8, y_tolerance=2.8, use_text_flow=False) or []
     below = [w for w in words if w["top"] >= y_cut]
 
     y_bin = 3
-    lines: Dict[int, List[dict]] = {}
-    for w in below:
-        key = round(w["top"] / y_bin) * y_bin
-        lines.setdefault(key, []).append(w)
+    lines = _group_by_y(below, y_bin)
+    # Se ordena cada renglón por x0 una sola vez; buckets, jtxt y jlines heredan ese orden
+    for line in lines.values():
+        line.sort(key=_X0)
 
     xb = _build_xbands(centers)
 
     def jtxt(ws: List[dict]) -> str:
-        return _clean(" ".join(w["text"] for w in sorted(ws, key=lambda x: x["x0"])))
+        return _clean(" ".join(w["text"] for w in ws))
 
     def jlines(ws: List[dict]) -> List[str]:
-        yb = 2
-        by: Dict[int, List[dict]] = {}
-        for w in ws:
-            k = round(w["top"] / yb) * yb
-            by.setdefault(k, []).append(w)
+        by = _group_by_y(ws, 2)
         out = []
-        for _, group in sorted(by.items()):
-            out.append(_clean(" ".join(w["text"] for w in sorted(group, key=lambda x: x["x0"]))))
+        for group in by.values():
+            out.append(_clean(" ".join(w["text"] for w in group)))
         return out
 
     def looks_like_footer(full_line: List[dict]) -> bool:
-        t = _norm(" ".join(w["text"] for w in sorted(full_line, key=lambda x: x["x0"])))
+        t = _norm(" ".join(w["text"] for w in full_line))
         return any(term in t for term in FOOTER_TERMS)
 
-    rows: List[Dict] = []
+    _fechas, _refs, _descs = cols["Fecha"], cols["Referencia"], cols["Descripción"]
+    _cargos, _abonos, _saldos = cols["Cargos"], cols["Abonos"], cols["Saldo"]
 
     last_month: Optional[str] = None
     pending_month: Optional[str] = None
@@ -289,19 +378,16 @@ def _parse_page(page, year: int) -> List[Dict]:
     def flush(force=False):
         nonlocal cur_date, cur_desc_lines, cur_ref, cur_cargo, cur_abono, cur_saldo
         if cur_date and (force or cur_desc_lines or any(v is not None for v in (cur_cargo, cur_abono, cur_saldo))):
-            desc = _normalize_concept_lines(cur_desc_lines)
-            rows.append({
-                "Fecha": cur_date,
-                "Referencia": cur_ref or "",
-                "Descripción": desc,
-                "Cargos": cur_cargo if cur_cargo is not None else "",
-                "Abonos": cur_abono if cur_abono is not None else "",
-                "Saldo":  cur_saldo if cur_saldo is not None else "",
-            })
+            _fechas.append(cur_date)
+            _refs.append(cur_ref or "")
+            _descs.append(_normalize_concept_lines(cur_desc_lines))
+            _cargos.append(cur_cargo)
+            _abonos.append(cur_abono)
+            _saldos.append(cur_saldo)
         cur_date = None; cur_desc_lines = []; cur_ref = None
         cur_cargo = None; cur_abono = None; cur_saldo = None
 
-    for _, line in sorted(lines.items()):
+    for line in lines.values():
         if looks_like_footer(line):
             flush(force=True)
             break
@@ -383,14 +469,17 @@ def _parse_page(page, year: int) -> List[Dict]:
         v_abono = _to_amount(abo_txt)
         v_saldo = _to_amount(sal_txt)
 
+        # Importes pegados en la columna SALDO (se parsean una sola vez)
+        nums = (
+            [float(x.replace(",", "")) for x in AMOUNT_RX.findall(sal_txt)]
+            if sal_txt and (v_abono is None or v_cargo is None) else []
+        )
         if v_abono is None:
-            nums = [float(x.replace(",", "")) for x in AMOUNT_RX.findall(sal_txt or "")]
             if len(nums) >= 2:
                 v_abono = nums[-2]
                 if v_saldo is None:
                     v_saldo = nums[-1]
         if v_cargo is None:
-            nums = [float(x.replace(",", "")) for x in AMOUNT_RX.findall(sal_txt or "")]
             if len(nums) >= 2 and v_abono is None:
                 v_cargo = nums[-2]
                 if v_saldo is None:
@@ -406,14 +495,26 @@ def _parse_page(page, year: int) -> List[Dict]:
             if v_saldo is not None: cur_saldo = v_saldo
 
     flush()
-    return rows
+    return cols
+
+# Con pocas páginas no compensa levantar procesos
+_PARALLEL_MIN_PAGES = 5
+
+def _parse_pages(pages_words: List[List[dict]], year: int) -> List[Dict[str, List]]:
+    """Parsea todas las páginas, en procesos aparte si son varias; respeta el orden."""
+    workers = min(len(pages_words), os.cpu_count() or 1)
+    if len(pages_words) >= _PARALLEL_MIN_PAGES and workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                return list(ex.map(_parse_page, pages_words, [year] * len(pages_words)))
+        except Exception:
+            pass  # sin multiproceso disponible: secuencial
+    return [_parse_page(words, year) for words in pages_words]
 
 # --------- Posprocesado de DataFrame: unir filas huérfanas ---------
-def _is_empty_val(v) -> bool:
-    if v is None: return True
-    if isinstance(v, float) and pd.isna(v): return True
-    if isinstance(v, str) and not v.strip(): return True
-    return False
+def _is_empty_col(s: pd.Series) -> pd.Series:
+    """None/NaN o texto en blanco, vectorizado."""
+    return s.isna() | s.astype(str).str.strip().eq("")
 
 def _merge_orphan_rows(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -421,61 +522,71 @@ def _merge_orphan_rows(df: pd.DataFrame) -> pd.DataFrame:
     se considera “huérfana”: se concatena su Descripción al final
     de la fila inmediatamente anterior y se elimina.
     """
-    cols = ["Fecha","Referencia","Descripción","Cargos","Abonos","Saldo"]
-    out: List[Dict] = []
-    for _, row in df.iterrows():
-        ref_empty = _is_empty_val(row.get("Referencia"))
-        no_amounts = all(_is_empty_val(row.get(c)) for c in ["Cargos","Abonos","Saldo"])
-        desc = str(row.get("Descripción") or "").strip()
-        if ref_empty and no_amounts and desc and len(out) > 0:
-            prev = out[-1].copy()
-            prev["Descripción"] = _clean(f"{prev.get('Descripción','')} {desc}")
-            out[-1] = prev
-        else:
-            out.append({k: row.get(k) for k in cols})
-    return pd.DataFrame(out, columns=cols)
+    cols = MOV_COLS
+    if df.empty:
+        return df.reindex(columns=cols)
+    df = df.reset_index(drop=True)
+
+    desc = df["Descripción"].fillna("").astype(str).str.strip()
+    no_amounts = pd.concat([_is_empty_col(df[c]) for c in ["Cargos","Abonos","Saldo"]], axis=1).all(axis=1)
+    is_orphan = _is_empty_col(df["Referencia"]) & no_amounts & desc.ne("")
+    is_orphan.iloc[0] = False  # la primera fila no tiene a quién unirse
+
+    # Cada huérfana pertenece a la última fila no huérfana anterior
+    parent = (~is_orphan).cumsum().to_numpy() - 1
+    texts = df["Descripción"].fillna("").astype(str).where(~is_orphan, desc)
+    joined = texts.groupby(parent).agg(" ".join).map(_clean).to_numpy()
+    has_orphans = is_orphan.groupby(parent).any().to_numpy()
+
+    out = df.loc[~is_orphan, cols].reset_index(drop=True)
+    out["Descripción"] = out["Descripción"].where(~has_orphans, joined)
+    return out
 
 # ---------------- Export principal ----------------
 def extract_inbursa_to_xlsx(pdf_path: str, xlsx_out: str) -> None:
+    # Una sola pasada por el PDF: texto (encabezado) y palabras (movimientos) por página
     pages_text: List[str] = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for p in pdf.pages:
-            pages_text.append(p.extract_text() or "")
-        full_text = "\n".join(pages_text)
-
-        hdr = _parse_header_info(full_text)
-        year = _guess_year(hdr)
-
-        info_df = pd.DataFrame([{
-            "Banco": "INBURSA",
-            "Archivo": os.path.basename(pdf_path),
-            "Periodo inicio": hdr.get("periodo_inicio"),
-            "Periodo fin": hdr.get("periodo_fin"),
-            "Empresa": "",
-            "RFC": hdr.get("rfc") or "",
-        }])
-
-        cuenta_df = pd.DataFrame([{
-            "No. de cuenta": hdr.get("account") or "",
-            "No. de cliente": hdr.get("cliente") or "",
-            "CLABE": hdr.get("clabe") or "",
-            "Producto": "Cuenta",
-            "Moneda": hdr.get("moneda") or "MXN",
-        }])
-
-        all_rows: List[Dict] = []
-        for page in pdf.pages:
-            all_rows.extend(_parse_page(page, year))
-
-    # DataFrame de movimientos
-    mov_df = pd.DataFrame(all_rows, columns=["Fecha","Referencia","Descripción","Cargos","Abonos","Saldo"])
-    for col in ["Cargos","Abonos","Saldo"]:
-        mov_df[col] = pd.to_numeric(mov_df[col], errors="coerce")
+    pages_words: List[List[dict]] = []
+    with _open_pages(pdf_path) as pages:
+        for p in pages:
+            pages_text.append(_page_text(p))
+            pages_words.append(_page_words(p))
+    full_text = "\n".join(pages_text)
+
+    hdr = _parse_header_info(full_text)
+    year = _guess_year(hdr)
+
+    info_df = pd.DataFrame([{
+        "Banco": "INBURSA",
+        "Archivo": os.path.basename(pdf_path),
+        "Periodo inicio": hdr.get("periodo_inicio"),
+        "Periodo fin": hdr.get("periodo_fin"),
+        "Empresa": "",
+        "RFC": hdr.get("rfc") or "",
+    }])
+
+    cuenta_df = pd.DataFrame([{
+        "No. de cuenta": hdr.get("account") or "",
+        "No. de cliente": hdr.get("cliente") or "",
+        "CLABE": hdr.get("clabe") or "",
+        "Producto": "Cuenta",
+        "Moneda": hdr.get("moneda") or "MXN",
+    }])
+
+    all_cols: Dict[str, List] = {c: [] for c in MOV_COLS}
+    for page_cols in _parse_pages(pages_words, year):
+        for c, vals in page_cols.items():
+            all_cols[c].extend(vals)
+
+    # DataFrame de movimientos (columna por columna, sin pasar por una lista de dicts)
+    # Los importes ya son float/None: sin volver a parsear con to_numeric
+    mov_df = pd.DataFrame(all_cols, columns=MOV_COLS).astype({"Cargos": float, "Abonos": float, "Saldo": float})
 
     # ✅ Une “continuaciones” huérfanas
     mov_df = _merge_orphan_rows(mov_df)
 
-    with pd.ExcelWriter(xlsx_out, engine="openpyxl") as xw:
+    # Sin constant_memory: pandas escribe por columnas y ese modo exige orden por filas
+    with pd.ExcelWriter(xlsx_out, engine=_XLSX_ENGINE) as xw:
         info_df.to_excel(xw, sheet_name="info", index=False)
         cuenta_df.to_excel(xw, sheet_name="cuenta", index=False)
         mov_df.to_excel(xw, sheet_name="movimientos", index=False)
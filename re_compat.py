@@ -0,0 +1,34 @@
+# re_compat.py
+"""
+Compilación de regex con RE2 (google-re2, tiempo lineal) cuando está
+instalado y el patrón lo permite; si no, con el módulo `re` estándar.
+"""
+from __future__ import annotations
+
+import re
+
+# RE2 (google-re2); opcional
+try:
+    import re2 as _re2  # pip install google-re2
+except Exception:
+    _re2 = None
+
+# Banderas que RE2 entiende como prefijo en línea; re.U es el default para str
+_RE2_INLINE = ((re.I, "i"), (re.M, "m"), (re.S, "s"))
+_RE2_FLAGS = re.I | re.M | re.S | re.U
+
+
+def rx(pattern: str, flags: int = 0):
+    """
+    Compila `pattern` con RE2 si está disponible; si el patrón usa algo que RE2
+    no soporta (backreferences, lookarounds) o alguna bandera distinta de
+    re.I/re.M/re.S, se compila con `re` respetando todas las banderas.
+    """
+    flags = int(flags)
+    if _re2 is not None and not (flags & ~_RE2_FLAGS):
+        inline = "".join(ch for f, ch in _RE2_INLINE if flags & f)
+        try:
+            return _re2.compile((f"(?{inline})" if inline else "") + pattern)
+        except Exception:
+            pass
+    return re.compile(pattern, flags)
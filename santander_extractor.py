@@ -1,15 +1,35 @@
 # santander_extractor.py
 from __future__ import annotations
 
+import functools
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import pdfplumber
 
+# Regex con RE2 (tiempo lineal) si está instalado; si no, re
+from re_compat import rx as _rx
+
+# Aho–Corasick (pyahocorasick) para buscar todas las palabras clave en una pasada; opcional
+try:
+    import ahocorasick  # pip install pyahocorasick
+except Exception:
+    ahocorasick = None
+
+# Escritor XLSX: xlsxwriter (más rápido, no crea objetos por celda) si está; si no, openpyxl
+try:
+    import xlsxwriter  # noqa: F401  pip install xlsxwriter
+    _XLSX_ENGINE = "xlsxwriter"
+except Exception:
+    _XLSX_ENGINE = "openpyxl"
+
 
 # ===========================
 # Utilidades generales
@@ -23,6 +43,11 @@ MES_ABREV = {
 TOTAL_PAT = re.compile(r"(?i)\bTOTAL\b")
 SALDO_FINAL_PAT = re.compile(r"(?i)SALDO\s+FINAL\s+DEL\s+PERIODO")
 
+_CUT_RE = re.compile(
+    "|".join(f"(?:{p.pattern.removeprefix('(?i)')})" for p in (TOTAL_PAT, SALDO_FINAL_PAT)),
+    re.I,
+)
+
 def _has_total_or_final(s: str) -> bool:
     return bool(TOTAL_PAT.search(s) or SALDO_FINAL_PAT.search(s))
 
@@ -34,7 +59,8 @@ DATE_TOKEN_SANT = re.compile(r"(\d{2})\s*-\s*([A-Za-zÁá]{3})\s*-\s*(\d{4})")
 
 # Excepción BANCO INVEX: tokens tipo 0,000,070.69 deben ser parte de la descripción
 BANCOINVEX_TAG_RE = re.compile(r"(?i)BANCO\s*INVEX")
-BANCOINVEX_FAKE_AMT_RE = re.compile(r"\b0(?:,\d{3}){2,}\.\d{2}\b")
+# (se aplica con fullmatch sobre el tramo de AMOUNT_RE, por eso admite su "$ " opcional)
+BANCOINVEX_FAKE_AMT_RE = re.compile(r"\$? *0(?:,\d{3}){2,}\.\d{2}")
 
 # Encabezados de sección
 HEAD_CUENTA = re.compile(r"(?im)^\s*Detalle(?:s)?\s+de\s+movimientos\s+cuenta\s+de\s+cheques\b")
@@ -71,11 +97,57 @@ PAGINA_WORD_PAT = re.compile(r"(?i)\bP[\W_]*GINA\s*\d+\s*DE\s*\d+\b")
 PP_NUM_PAT      = re.compile(r"(?i)\bP-?P\.?\s*\d+\b")
 DETALLES_HEADER_PAT = re.compile(r"(?i)Detalle[s]?\s+de\s+movimientos")
 
+# Renglones a descartar en el parser (encabezado de tabla, totales, pie de página) en un solo search;
+# con re.I se aplica al texto tal cual, sin pasarlo a mayúsculas
+_ROW_SKIP_RE = re.compile(
+    r"\A(?=.*FECHA)(?=.*FOLIO)(?=.*SALDO)"
+    r"|\A\s*TOTAL"
+    r"|SALDO FINAL DEL PERIODO"
+    + "".join("|" + p.pattern.removeprefix("(?i)") for p in (DETALLES_HEADER_PAT, PAGINA_WORD_PAT, PP_NUM_PAT)),
+    re.I | re.S,
+)
+
+# Todas las señales de basura en una sola alternancia (un solo recorrido del texto).
+# CLAVE DE RASTREO va primero: si aparece, el fragmento se conserva.
+GARBAGE_PAT = _rx(
+    "|".join(
+        f"(?P<{name}>{pat.pattern.removeprefix('(?i)')})"
+        for name, pat in (
+            ("clave", CLAVE_RASTREO_PAT),
+            ("fiscal", INFO_FISCAL_PAT),
+            ("pagina", PAGINA_WORD_PAT),
+            ("pp", PP_NUM_PAT),
+            ("detalles", DETALLES_HEADER_PAT),
+            ("b64", BASE64ISH_PAT),
+        )
+    ),
+    re.I,
+)
+# Señales que descartan la fila aun con CLAVE DE RASTREO (todas menos base64)
+HARD_GARBAGE_PAT = _rx(
+    "|".join(p.pattern.removeprefix("(?i)") for p in (INFO_FISCAL_PAT, PAGINA_WORD_PAT, PP_NUM_PAT, DETALLES_HEADER_PAT)),
+    re.I,
+)
+# Paginación y "P-P 12345" en un solo sub (antes, uno por patrón)
+PAGE_GARBAGE_PAT = _rx(
+    "|".join(p.pattern.removeprefix("(?i)") for p in (PAGINA_WORD_PAT, PP_NUM_PAT)),
+    re.I,
+)
+
+# Espacios, separadores y folio numérico al inicio de renglón
+WS_RE          = re.compile(r"\s+")
+NON_ALNUM_RE   = re.compile(r"[^A-Z0-9]")
+LEAD_FOLIO_RE  = re.compile(r"^\d{5,}\s+")
+_NON_WS_RE     = re.compile(r"\S")
+
 
 # ===========================
 # Helpers
 # ===========================
 
+# Palabra 'TOTAL' sola o 'SALDO FINAL DEL PERIODO' (\s incluye el NBSP)
+_FOOTER_RE = re.compile(r"^\s*TOTAL\s*$|SALDO\s+FINAL\s+DEL\s+PERIODO", re.I)
+
 def _drop_footer_totals(words: List[dict]) -> List[dict]:
     """
     Quita de la página todo lo que esté en la fila de 'TOTAL' y por debajo
@@ -84,8 +156,7 @@ def _drop_footer_totals(words: List[dict]) -> List[dict]:
     """
     y_cut = None
     for w in words:
-        t = (w.get("text") or "").replace("\u00a0", " ").strip().upper()
-        if t == "TOTAL" or "SALDO FINAL DEL PERIODO" in t:
+        if _FOOTER_RE.search(w.get("text") or ""):
             y_cut = w["top"] if y_cut is None else min(y_cut, w["top"])
     if y_cut is None:
         return words
@@ -94,13 +165,7 @@ def _drop_footer_totals(words: List[dict]) -> List[dict]:
 
 def _cut_after_totals(s: str) -> str:
     """Si la línea contiene 'TOTAL' o 'SALDO FINAL DEL PERIODO', corta desde ahí a la derecha."""
-    m1 = TOTAL_PAT.search(s)
-    m2 = SALDO_FINAL_PAT.search(s)
-    m = None
-    if m1 and m2:
-        m = m1 if m1.start() < m2.start() else m2
-    else:
-        m = m1 or m2
+    m = _CUT_RE.search(s)  # la coincidencia más a la izquierda de cualquiera de los dos
     return s[:m.start()].rstrip() if m else s
 
 
@@ -110,28 +175,29 @@ def _is_garbage_piece(s: str) -> bool:
     """
     if not s:
         return True
-    if CLAVE_RASTREO_PAT.search(s):
-        return False
-    if INFO_FISCAL_PAT.search(s):
-        return True
-    if BASE64ISH_PAT.search(s):
-        return True
-    return False
+    garbage = False
+    for m in GARBAGE_PAT.finditer(s):
+        if m.lastgroup == "clave":
+            return False
+        if m.lastgroup in ("fiscal", "b64"):
+            garbage = True
+    return garbage
 
 
 def _strip_page_garbage(s: str) -> str:
     """Quita paginación y basura “P-P 12345”, y compacta espacios."""
-    s = PAGINA_WORD_PAT.sub("", s)
-    s = PP_NUM_PAT.sub("", s)
-    s = re.sub(r"\s+", " ", s).strip()
+    s = PAGE_GARBAGE_PAT.sub("", s)
+    s = WS_RE.sub(" ", s).strip()
     return s
 
+_AMT_TRANS = str.maketrans({"\u00a0": None, "$": None, " ": None, ",": None})
+
+@functools.lru_cache(maxsize=4096)
 def _norm_amount(s: Optional[str]) -> float:
     if not s:
         return 0.0
-    txt = s.replace("\u00a0", " ").replace("$", "").replace(" ", "").replace(",", "")
     try:
-        return float(txt)
+        return float(s.translate(_AMT_TRANS))
     except Exception:
         return 0.0
 
@@ -147,12 +213,15 @@ def _pick_amount(s: Optional[str], prefer: str = "first") -> Optional[float]:
     val = m[0] if prefer == "first" else m[-1]
     return _norm_amount(val)
 
+_PARSE_DATE_TRANS = str.maketrans({"\u00a0": " ", "Á": "A", "É": "E", "Í": "I", "Ó": "O", "Ú": "U"})
+
+@functools.lru_cache(maxsize=256)
 def _parse_ddmonyyyy(token: str) -> Optional[date]:
-    m = DATE_TOKEN_SANT.search(token.replace("\u00a0", " ").upper())
+    m = DATE_TOKEN_SANT.search(token.upper().translate(_PARSE_DATE_TRANS))
     if not m:
         return None
     dd = int(m.group(1))
-    mon = MES_ABREV.get(m.group(2).lower().replace("á", "a"))
+    mon = MES_ABREV.get(m.group(2).lower())
     yy = int(m.group(3))
     if not mon:
         return None
@@ -169,15 +238,13 @@ def _extract_tail_run(line: str, maxn: int = 3) -> Tuple[str, List[float]]:
 
     # Buscar importes
     ms = list(AMOUNT_RE.finditer(s))
+    if not ms:
+        return s, []
 
     # --- Excepción BANCO INVEX: descartar "importes" como 0,000,070.69 / 0,000,000.02
+    # (solo en las líneas con la etiqueta; se valida sobre el tramo sin copiar la cadena)
     if BANCOINVEX_TAG_RE.search(s):
-        ms = [
-            m for m in ms
-            if not BANCOINVEX_FAKE_AMT_RE.fullmatch(
-                m.group(0).replace("$", "").replace(" ", "")
-            )
-        ]
+        ms = [m for m in ms if not BANCOINVEX_FAKE_AMT_RE.fullmatch(s, m.start(), m.end())]
 
     if not ms:
         return s, []
@@ -187,8 +254,8 @@ def _extract_tail_run(line: str, maxn: int = 3) -> Tuple[str, List[float]]:
     cur_start = ms[-1].start()
     j = len(ms) - 2
     while j >= 0 and len(tail) < maxn:
-        between = s[ms[j].end():cur_start]
-        if between.strip():
+        # ¿texto entre importes? se busca en el rango sin recortar la cadena
+        if _NON_WS_RE.search(s, ms[j].end(), cur_start):
             break
         tail.append(ms[j])
         cur_start = ms[j].start()
@@ -204,30 +271,37 @@ def _extract_tail_run(line: str, maxn: int = 3) -> Tuple[str, List[float]]:
 # Helpers news
 # ===========================
 
+_ACCENT_TRANS = str.maketrans("ÁÉÍÓÚÜÑ", "AEIOUUN")
+
+@functools.lru_cache(maxsize=4096)
 def _norm_u(s: Optional[str]) -> str:
     """Mayúsculas, sin acentos y espacios compactados (no elimina espacios)."""
     if not s:
         return ""
-    u = s.upper()
-    # quitar acentos/ñ
-    u = (u.replace("Á", "A").replace("É", "E").replace("Í", "I")
-           .replace("Ó", "O").replace("Ú", "U").replace("Ü", "U")
-           .replace("Ñ", "N"))
-    return re.sub(r"\s+", " ", u).strip()
-
-def _has_tokens(desc: str, tokens: List[str]) -> bool:
+    # quitar acentos/ñ en una sola pasada
+    u = s.upper().translate(_ACCENT_TRANS)
+    return WS_RE.sub(" ", u).strip()
+
+@functools.lru_cache(maxsize=None)
+def _token_matcher(tokens: Tuple[str, ...]):
     """
-    True si 'desc' contiene alguno de los tokens, tolerando espacios/guiones.
-    Checa dos variantes: con espacios y 'compacta' sin separadores.
+    Buscador de varios tokens a la vez sobre texto 'compacto' (sin separadores).
+    Si un token aparece con espacios, también aparece compacto, así que basta
+    con la variante compacta.
     """
-    u0 = _norm_u(desc)
-    u1 = re.sub(r"[^A-Z0-9]", "", u0)  # sin espacios ni signos
-    for t in tokens:
-        t0 = _norm_u(t)
-        t1 = re.sub(r"[^A-Z0-9]", "", t0)
-        if t0 in u0 or t1 in u1:
-            return True
-    return False
+    keys = sorted({NON_ALNUM_RE.sub("", _norm_u(t)) for t in tokens} - {""})
+    if ahocorasick is not None:
+        auto = ahocorasick.Automaton()
+        for k in keys:
+            auto.add_word(k, k)
+        auto.make_automaton()
+        return lambda u: next(auto.iter(u), None) is not None
+    rx = re.compile("|".join(map(re.escape, keys)))
+    return lambda u: rx.search(u) is not None
+
+def _prep_desc(desc: str) -> str:
+    """Descripción normalizada y compacta (sin espacios ni signos), para calcular una sola vez."""
+    return NON_ALNUM_RE.sub("", _norm_u(desc))
 
 # Palabras clave
 
@@ -246,6 +320,10 @@ RETIRO_KEYS = [
     "APORT", "LINEA CAPTURA", "CAPTURA INTERNET"
 ]
 
+# Buscadores ya normalizados (reciben el resultado de _prep_desc)
+_HAS_ABONO  = _token_matcher(tuple(ABONO_KEYS))
+_HAS_RETIRO = _token_matcher(tuple(RETIRO_KEYS))
+
 # ===========================
 # Clasificación por palabras (REEMPLAZA _classify_by_keywords completo)
 # ===========================
@@ -256,10 +334,11 @@ def _classify_by_keywords(desc_upper: str, monto: float) -> Tuple[float, float]:
     """
     if monto == 0.0:
         return 0.0, 0.0
-    # desc_upper puede venir ya en mayúsculas; normalizamos igual.
-    if _has_tokens(desc_upper, ABONO_KEYS):
+    # desc_upper puede venir ya en mayúsculas; normalizamos igual (una vez).
+    u1 = _prep_desc(desc_upper)
+    if _HAS_ABONO(u1):
         return 0.0, monto
-    if _has_tokens(desc_upper, RETIRO_KEYS):
+    if _HAS_RETIRO(u1):
         return monto, 0.0
     # por defecto, tratar como abono (depósito)
     return 0.0, monto
@@ -268,6 +347,12 @@ def _classify_by_keywords(desc_upper: str, monto: float) -> Tuple[float, float]:
 # Reconciliación (REEMPLAZA _reconcile_amounts completo)
 # ===========================
 
+@functools.lru_cache(maxsize=4096)
+def _desc_flags(desc: str) -> Tuple[bool, bool]:
+    """(¿pinta a abono?, ¿pinta a retiro?). Cacheado: la misma descripción se reconcilia varias veces."""
+    u1 = _prep_desc(desc)
+    return bool(_HAS_ABONO(u1)), bool(_HAS_RETIRO(u1))
+
 def _reconcile_amounts(desc: str, dep: float, ret: float) -> Tuple[float, float]:
     """
     Un movimiento es o depósito o retiro. Usamos las palabras clave para
@@ -276,8 +361,10 @@ def _reconcile_amounts(desc: str, dep: float, ret: float) -> Tuple[float, float]
     """
     dep = dep or 0.0
     ret = ret or 0.0
-    has_abono = _has_tokens(desc, ABONO_KEYS)
-    has_retiro = _has_tokens(desc, RETIRO_KEYS)
+    if dep <= 0 and ret <= 0:
+        # nada que mover: no hace falta revisar palabras clave
+        return round(dep, 2), round(ret, 2)
+    has_abono, has_retiro = _desc_flags(desc)
 
     # Caso: ambos llenos -> decide por keywords
     if dep > 0 and ret > 0:
@@ -300,7 +387,7 @@ def _reconcile_amounts(desc: str, dep: float, ret: float) -> Tuple[float, float]
     return round(dep, 2), round(ret, 2)
 
 
-@dataclass
+@dataclass(slots=True)
 class TxRow:
     f_oper: Optional[date] = None
     folio: Optional[str] = None
@@ -314,20 +401,31 @@ class TxRow:
 # Parsing por coordenadas
 # ===========================
 
+# Encabezados de columna: variante -> llave
+_LABEL_LOOKUP = {
+    "FECHA": "FECHA",
+    "FOLIO": "FOLIO",
+    "DESCRIPCION": "DESCRIPCION", "DESCRIPCIÓN": "DESCRIPCION",
+    "DEPOSITO": "DEPOSITO", "DEPÓSITO": "DEPOSITO",
+    "RETIRO": "RETIRO",
+    "SALDO": "SALDO",
+}
+_LABEL_KEYS = ("FECHA", "FOLIO", "DESCRIPCION", "DEPOSITO", "RETIRO", "SALDO")
+# Para palabras que solo contienen la etiqueta (p. ej. "SALDO:" o "DEPOSITO/RETIRO")
+_LABEL_ANY_RE = re.compile("|".join(sorted(map(re.escape, _LABEL_LOOKUP), key=len, reverse=True)))
+
 def _detect_columns(words: List[dict], page_width: float) -> Tuple[List[Tuple[float, float]], float]:
     hits: Dict[str, List[dict]] = {}
-    labels = {
-        "FECHA": ["FECHA"],
-        "FOLIO": ["FOLIO"],
-        "DESCRIPCION": ["DESCRIPCION", "DESCRIPCIÓN"],
-        "DEPOSITO": ["DEPOSITO", "DEPÓSITO"],
-        "RETIRO": ["RETIRO"],
-        "SALDO": ["SALDO"],
-    }
     for w in words:
         t = w["text"].upper()
-        for key, opts in labels.items():
-            if any(o in t for o in opts):
+        key = _LABEL_LOOKUP.get(t)
+        if key is not None:
+            hits.setdefault(key, []).append(w)
+            continue
+        # Orden de llaves como antes: FECHA, FOLIO, DESCRIPCION, DEPOSITO, RETIRO, SALDO
+        keys = {_LABEL_LOOKUP[m] for m in _LABEL_ANY_RE.findall(t)}
+        for key in _LABEL_KEYS:
+            if key in keys:
                 hits.setdefault(key, []).append(w)
 
     def cx(key, default_frac):
@@ -369,24 +467,44 @@ def _group_rows(words: List[dict], header_y: float) -> List[List[dict]]:
     avg_h = (sum(heights) / len(heights)) if heights else 8.0
     ybin = max(2.0, min(4.2, avg_h * 0.70))
 
-    rows: Dict[int, List[dict]] = {}
-    for w in body:
-        yk = int(round(w["top"] / ybin))
-        rows.setdefault(yk, []).append(w)
-
-    return [sorted(rows[k], key=lambda x: x["x0"]) for k in sorted(rows.keys())]
+    # Llave de renglón para todas las palabras a la vez; orden estable y cortes por llave
+    tops = np.fromiter((w["top"] for w in body), dtype=float, count=len(body))
+    keys = np.round(tops / ybin).astype(np.int64)
+    order = np.argsort(keys, kind="stable")
+    _, starts = np.unique(keys[order], return_index=True)
+    bounds = starts.tolist() + [len(body)]
+    idx = order.tolist()
+    return [
+        sorted((body[i] for i in idx[a:b]), key=lambda x: x["x0"])
+        for a, b in zip(bounds[:-1], bounds[1:])
+    ]
 
 
-def _assign_cols(row_words: List[dict], bounds: List[Tuple[float, float]]) -> List[str]:
-    cols = [""] * 6
-    for w in row_words:
-        xc = (w["x0"] + w["x1"]) / 2
-        text = w["text"]
-        for i, (x0, x1) in enumerate(bounds):
-            if x0 <= xc <= x1:
-                cols[i] = (cols[i] + " " + text).strip() if cols[i] else text
-                break
-    return [c.strip() for c in cols]
+def _assign_cols(rows: List[List[dict]], bounds: List[Tuple[float, float]]) -> List[List[str]]:
+    """Texto de las 6 columnas para cada renglón; la geometría de toda la página va en un solo cálculo."""
+    if not rows:
+        return []
+    flat = [w for r in rows for w in r]
+    # Bandas crecientes: la candidata es la última con x0 <= xc; luego se valida su x1
+    lefts = np.fromiter((b[0] for b in bounds), dtype=float, count=len(bounds))
+    rights = np.fromiter((b[1] for b in bounds), dtype=float, count=len(bounds))
+    xc = np.fromiter(((w["x0"] + w["x1"]) / 2 for w in flat), dtype=float, count=len(flat))
+    idx = np.searchsorted(lefts, xc, side="right") - 1
+    ok = (idx >= 0) & (xc <= rights[np.maximum(idx, 0)])
+    # -1 = fuera de toda banda
+    col_of = np.where(ok, idx, -1).tolist()
+
+    out: List[List[str]] = []
+    k = 0
+    for r in rows:
+        cols: List[List[str]] = [[] for _ in range(6)]
+        for w in r:
+            c = col_of[k]
+            k += 1
+            if c >= 0:
+                cols[c].append(w["text"])
+        out.append([" ".join(c).strip() for c in cols])
+    return out
 
 
 # ===========================
@@ -424,20 +542,21 @@ def _clean_movements_df(df: pd.DataFrame) -> pd.DataFrame:
     )
     df = df[~mask_empty].reset_index(drop=True)
 
-    drop_mask = (
-        df["Descripción"].astype(str).str.contains(INFO_FISCAL_PAT, regex=True) |
-        df["Descripción"].astype(str).str.contains(PAGINA_WORD_PAT, regex=True) |
-        df["Descripción"].astype(str).str.contains(DETALLES_HEADER_PAT, regex=True) |
-        df["Descripción"].astype(str).str.contains(PP_NUM_PAT, regex=True) |
-        (
-            df["Descripción"].astype(str).str.contains(BASE64ISH_PAT, regex=True) &
-            ~df["Descripción"].astype(str).str.contains(CLAVE_RASTREO_PAT, regex=True)
-        )
-    )
-
-    df = df[~drop_mask].reset_index(drop=True)
-
-    df["Descripción"] = df["Descripción"].astype(str).apply(_strip_page_garbage)
+    desc = df["Descripción"].astype(str)
+
+    # Un solo recorrido con la alternancia sobre toda la columna; solo las filas
+    # con alguna señal se revisan otra vez por la excepción de CLAVE DE RASTREO.
+    drop_mask = desc.map(lambda t: GARBAGE_PAT.search(t) is not None).astype(bool)
+    cand = desc[drop_mask]
+    with_clave = cand[cand.map(lambda t: CLAVE_RASTREO_PAT.search(t) is not None).astype(bool)]
+    if not with_clave.empty:
+        drop_mask.loc[with_clave.index] = with_clave.map(
+            lambda t: HARD_GARBAGE_PAT.search(t) is not None
+        ).astype(bool)
+
+    keep = ~drop_mask.to_numpy()
+    df = df[keep].reset_index(drop=True)
+    df["Descripción"] = desc[keep].map(_strip_page_garbage).to_numpy()
     return df
 
 
@@ -466,20 +585,25 @@ _BLACKLIST = {
     "MOVIMIENTOS", "PERIODO", "PERÍODO", "CUENTA", "SANTANDER", "BANCO"
 }
 
+# Alternancias precompiladas (los espacios de _ADDR_TOKENS son parte del token)
+_ADDR_RE      = re.compile("|".join(re.escape(t) for t in sorted(_ADDR_TOKENS, key=len, reverse=True)))
+_BLACKLIST_RE = re.compile("|".join(re.escape(t) for t in sorted(_BLACKLIST, key=len, reverse=True)))
+_HAS_DIGIT_RE = re.compile(r"\d")
+
 def _limpia_espacios(u: str) -> str:
-    return re.sub(r"\s+", " ", u).strip()
+    return WS_RE.sub(" ", u).strip()
 
 def _es_candidata_empresa(u: str) -> bool:
     u = " " + u.upper() + " "  # acolchonar para detectar tokens por palabra
-    if any(ch.isdigit() for ch in u):
+    if _HAS_DIGIT_RE.search(u):
         return False
-    if any(tok in u for tok in _ADDR_TOKENS):
+    if _ADDR_RE.search(u):
         return False
-    if any(bad in u for bad in _BLACKLIST):
+    if _BLACKLIST_RE.search(u):
         return False
     return True
 
-def _empresa_desde_primera_pagina(pdf_path: str) -> Optional[str]:
+def _empresa_desde_primera_pagina(page_text: str, words: List[dict], W: float, H: float) -> Optional[str]:
     """
     Busca la razón social en el bloque superior-izquierdo de la 1ª página.
     Fallback 1: unión de dos líneas consecutivas.
@@ -487,11 +611,6 @@ def _empresa_desde_primera_pagina(pdf_path: str) -> Optional[str]:
     Fallback 3: línea mayúscula más larga de la región que no sea dirección/encabezado.
     """
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            p = pdf.pages[0]
-            W, H = p.width, p.height
-            words = p.extract_words(x_tolerance=2, y_tolerance=2, use_text_flow=True)
-
         # Región superior-izquierda (debajo del logo)
         region = [w for w in words if w["x0"] < W * 0.70 and w["top"] < H * 0.38]
         if region:
@@ -508,21 +627,22 @@ def _empresa_desde_primera_pagina(pdf_path: str) -> Optional[str]:
                 for _, ws in sorted(lines.items(), key=lambda kv: min(x["top"] for x in kv[1]))
             ]
 
+            # Líneas ya limpias; se pasan a mayúsculas una sola vez
+            # (20 = lo que revisa el Fallback 3)
+            U = [ln.upper() for ln in ordered_lines[:20]]
+
             # Pass A: línea individual con sufijo típico
-            for ln in ordered_lines[:15]:
-                u = ln.upper()
+            for u in U[:15]:
                 if _RAZON_LINE_RE.match(u) and _es_candidata_empresa(u):
                     return u
 
             # Pass B: unión de dos líneas (por si "SA DE CV" quedó abajo)
-            for i in range(min(12, len(ordered_lines)-1)):
-                u = _limpia_espacios((ordered_lines[i] + " " + ordered_lines[i+1])).upper()
+            for a, b in zip(U[:12], U[1:13]):
+                u = f"{a} {b}" if a and b else (a or b)
                 if _RAZON_LINE_RE.match(u) and _es_candidata_empresa(u):
                     return u
 
         # Fallback 2: regex amplio sobre todo el texto de la 1ª página
-        with pdfplumber.open(pdf_path) as pdf:
-            page_text = (pdf.pages[0].extract_text() or "").replace("\u00a0", " ")
         matches = _RAZON_ANY_RE.findall(page_text)
         cands = []
         for m in matches:
@@ -536,14 +656,10 @@ def _empresa_desde_primera_pagina(pdf_path: str) -> Optional[str]:
         # Fallback 3: toma la línea mayúscula más larga de la región (sin dígitos / tokens)
         if region:
             best = None
-            for ln in ordered_lines[:20]:
-                u = _limpia_espacios(ln.upper())
-                if not EMPRESA_PAT.match(u):
-                    continue
-                if not _es_candidata_empresa(u):
-                    continue
-                if best is None or len(u) > len(best):
-                    best = u
+            for u in U:
+                if EMPRESA_PAT.match(u) and _es_candidata_empresa(u):
+                    if best is None or len(u) > len(best):
+                        best = u
             if best:
                 return best
 
@@ -556,8 +672,25 @@ def _empresa_desde_primera_pagina(pdf_path: str) -> Optional[str]:
 # Metadatos
 # ===========================
 
-def _parse_period(text: str) -> Tuple[Optional[date], Optional[date]]:
-    m = PERIODO_PAT.search(text)
+# RFC, cliente, CLABE y periodo en una sola pasada sobre el texto completo
+_META_PATS = {"rfc": RFC_PAT, "cliente": CLIENTE_PAT, "clabe": CLABE_PAT, "periodo": PERIODO_PAT}
+_META_RE = re.compile(
+    "|".join(f"(?P<{k}>{p.pattern.removeprefix('(?i)')})" for k, p in _META_PATS.items()),
+    re.I,
+)
+
+def _find_header_fields(txt: str) -> Dict[str, "re.Match[str]"]:
+    """Primera coincidencia de cada campo (con los grupos del patrón original)."""
+    found: Dict[str, "re.Match[str]"] = {}
+    for m in _META_RE.finditer(txt):
+        key = m.lastgroup
+        if key and key not in found:
+            found[key] = _META_PATS[key].match(txt, m.start())
+            if len(found) == len(_META_PATS):
+                break
+    return found
+
+def _parse_period(m: Optional["re.Match[str]"]) -> Tuple[Optional[date], Optional[date]]:
     if not m:
         return None, None
     d1 = _parse_ddmonyyyy(m.group(1))
@@ -565,25 +698,30 @@ def _parse_period(text: str) -> Tuple[Optional[date], Optional[date]]:
     return d1, d2
 
 
-def _extract_header_metadata(full_text: str, pdf_path: str) -> Dict[str, Optional[str]]:
+# El encabezado de Santander PYME cabe en la 1ª página; 2 por si se corta
+_META_PAGES = 2
+_META_REQUIRED = ("empresa", "rfc", "ncliente", "clabe", "pstart", "pend")
+
+def _extract_header_metadata(full_text: str, pdf_path: str, first_page: Optional["PageData"]) -> Dict[str, Optional[str]]:
     txt = full_text.replace("\u00a0", " ")
     lines = [ln.strip() for ln in txt.splitlines() if ln.strip()]
 
     # 1) Primero: razón social desde la 1ª página por coordenadas
-    empresa = _empresa_desde_primera_pagina(pdf_path)
+    empresa = _empresa_desde_primera_pagina(*first_page) if first_page else None
 
     # 2) Fallback: mismas reglas sobre el texto completo
     if not empresa:
         for ln in lines[:120]:
-            u = re.sub(r"\s+", " ", ln).upper().strip()
+            u = WS_RE.sub(" ", ln).upper().strip()
             if _es_candidata_empresa(u):
                 empresa = u
                 break
 
-    rfc = RFC_PAT.search(txt).group(1).upper() if RFC_PAT.search(txt) else None
-    ncliente = CLIENTE_PAT.search(txt).group(1) if CLIENTE_PAT.search(txt) else None
-    clabe = CLABE_PAT.search(txt).group(1) if CLIENTE_PAT.search(txt) else None
-    pstart, pend = _parse_period(txt)
+    found = _find_header_fields(txt)
+    rfc = m.group(1).upper() if (m := found.get("rfc")) else None
+    ncliente = m.group(1) if (m := found.get("cliente")) else None
+    clabe = m.group(1) if (m := found.get("clabe")) else None
+    pstart, pend = _parse_period(found.get("periodo"))
 
     return {
         "empresa": empresa,
@@ -596,56 +734,286 @@ def _extract_header_metadata(full_text: str, pdf_path: str) -> Dict[str, Optiona
     }
 
 
+# ===========================
+# Movimientos por página
+# ===========================
+
+# (texto, palabras, ancho, alto) de una página
+PageData = Tuple[str, List[dict], float, float]
+
+def _words_to_text(words: List[dict]) -> str:
+    """Texto de la página armado desde las palabras (renglones en orden visual)."""
+    return "\n".join(" ".join(w["text"] for w in r) for r in _group_rows(words, float("-inf")))
+
+def _page_data(page) -> PageData:
+    # Un solo recorrido del layout de pdfminer: el texto sale de las mismas palabras
+    words = page.extract_words(x_tolerance=2, y_tolerance=2, use_text_flow=True)
+    text = _words_to_text(words).replace("\u00a0", " ")
+    return text, words, page.width, page.height
+
+
+def _parse_movements_page(words_all: List[dict], page_width: float) -> List[Tuple[str, TxRow]]:
+    """
+    Movimientos de una página como (sección, TxRow). La sección no se arrastra
+    entre páginas, así que cada página se puede procesar por separado.
+    """
+    out: List[Tuple[str, TxRow]] = []
+
+    def flush_current(cur: Optional[TxRow], section: Optional[str]) -> None:
+        if not cur or not section:
+            return
+        cur.deposito, cur.retiro = _reconcile_amounts(cur.desc, cur.deposito, cur.retiro)
+        out.append((section, cur))
+
+    current: Optional[TxRow] = None
+    # Determinar la sección SOLO por el primer encabezado visible en los renglones
+    in_section: Optional[str] = None
+
+    words = _drop_footer_totals(words_all)
+    bounds, header_y = _detect_columns(words, page_width)
+    rows = _group_rows(words, header_y)
+    row_cols = _assign_cols(rows, bounds)
+
+    # Buscar encabezados dentro de la página (con orden visual)
+    markers: Dict[int, str] = {}
+    for idx, r in enumerate(rows):
+        sec = _row_section_marker(r)
+        if sec:
+            markers[idx] = sec
+
+    # Primera marca manda; si no hay, por defecto 'CUENTA'
+    if markers:
+        in_section = markers[min(markers.keys())]
+    else:
+        in_section = "CUENTA"
+
+    # Métodos y helpers como locales: el bucle corre una vez por renglón
+    row_skip = _ROW_SKIP_RE.search
+    date_search = DATE_TOKEN_SANT.search
+    date_sub = DATE_TOKEN_SANT.sub
+    amount_search = AMOUNT_RE.search
+    lead_folio_sub = LEAD_FOLIO_RE.sub
+    cut_after_totals = _cut_after_totals
+    extract_tail_run = _extract_tail_run
+    pick_amount = _pick_amount
+    strip_page_garbage = _strip_page_garbage
+    is_garbage_piece = _is_garbage_piece
+
+    for i, r in enumerate(rows):
+        if i in markers:
+            flush_current(current, in_section)
+            current = None
+            in_section = markers[i]    # cambia sección al vuelo por encabezado
+            continue
+
+        fecha_raw, folio_raw, desc_raw, dep_raw, ret_raw, saldo_raw = row_cols[i]
+        row_text = " ".join([w["text"] for w in r])
+
+        # Saltos obvios
+        if row_skip(row_text):
+            continue
+
+        new_date  = bool(date_search(fecha_raw))
+        has_money = any(amount_search(x or "") for x in (dep_raw, ret_raw, saldo_raw))
+        no_money  = not has_money
+
+        if new_date:
+            flush_current(current, in_section); current = None
+            f = _parse_ddmonyyyy(fecha_raw)
+
+            line_wo_date = date_sub("", row_text, count=1).strip()
+            line_wo_date = cut_after_totals(line_wo_date)
+            line_wo_date = lead_folio_sub("", line_wo_date)
+            desc_fb, tail = extract_tail_run(line_wo_date, 3)
+            total_row = _has_total_or_final(row_text)
+
+            dep_fb = ret_fb = 0.0; sal_fb = None
+            if len(tail) == 3:
+                dep_fb, ret_fb, sal_fb = tail
+            elif len(tail) == 2:
+                wv, dv = _classify_by_keywords(desc_fb.upper(), tail[0]); ret_fb, dep_fb = wv, dv; sal_fb = tail[1]
+            elif len(tail) == 1:
+                if total_row:
+                    wv, dv = _classify_by_keywords(desc_fb.upper(), tail[0])
+                    ret_fb, dep_fb = wv, dv
+                else:
+                    sal_fb = tail[0]
+
+            dep_col = pick_amount(dep_raw, "first")
+            ret_col = pick_amount(ret_raw, "first")
+            sal_col = pick_amount(saldo_raw, "last")
+            if total_row:
+                dep_col = ret_col = sal_col = None
+            if len(tail) >= 2:
+                dep_col = ret_col = sal_col = None
+
+            desc_txt = strip_page_garbage((desc_fb or (desc_raw or "")).strip())
+            if is_garbage_piece(desc_txt):
+                desc_txt = ""
+
+            dep_in = dep_col if dep_col is not None else (dep_fb or 0.0)
+            ret_in = ret_col if ret_col is not None else (ret_fb or 0.0)
+            dep_v, ret_v = _reconcile_amounts(desc_txt, dep_in, ret_in)
+
+            current = TxRow(
+                f_oper=f,
+                folio=folio_raw.strip() or None,
+                desc=desc_txt,
+                deposito=dep_v,
+                retiro=ret_v,
+                saldo=sal_col if sal_col is not None else sal_fb,
+            )
+            continue
+
+        if current and no_money and not new_date and (desc_raw or folio_raw or fecha_raw):
+            piece_col = (desc_raw or "").strip()
+            line = lead_folio_sub("", row_text.strip())
+            line = cut_after_totals(line)
+            piece_fb, _ = extract_tail_run(line, 3)
+            piece = strip_page_garbage(piece_fb if len(piece_fb) > len(piece_col) else piece_col)
+            if piece and not is_garbage_piece(piece):
+                current.desc = (current.desc + " " + piece).strip()
+            continue
+
+        if current and has_money and not new_date:
+            text_for_tail = cut_after_totals(row_text)
+            desc_fb, tail = extract_tail_run(text_for_tail, 3)
+            total_row = _has_total_or_final(row_text)
+
+            dep_v = ret_v = None; sal_v = None
+            if len(tail) == 3:
+                dep_v, ret_v, sal_v = tail
+            elif len(tail) == 2:
+                wv, dv = _classify_by_keywords((desc_fb or current.desc).upper(), tail[0])
+                ret_v, dep_v = wv, dv; sal_v = tail[1]
+            elif len(tail) == 1:
+                if total_row:
+                    wv, dv = _classify_by_keywords((desc_fb or current.desc).upper(), tail[0])
+                    ret_v, dep_v = wv, dv
+                else:
+                    sal_v = tail[0]
+
+            dep_col = pick_amount(dep_raw, "first")
+            ret_col = pick_amount(ret_raw, "first")
+            sal_col = pick_amount(saldo_raw, "last")
+
+            if len(tail) >= 2:
+                dep_col = ret_col = sal_col = None
+            if total_row:
+                dep_col = ret_col = sal_col = None
+
+            if dep_col is not None or dep_v is not None:
+                current.deposito = dep_col if dep_col is not None else (dep_v or 0.0)
+            if ret_col is not None or ret_v is not None:
+                current.retiro   = ret_col if ret_col is not None else (ret_v or 0.0)
+            if sal_col is not None or sal_v is not None:
+                current.saldo    = sal_col if sal_col is not None else sal_v
+
+            current.deposito, current.retiro = _reconcile_amounts(current.desc, current.deposito, current.retiro)
+
+            piece = strip_page_garbage((desc_fb or desc_raw or "").strip())
+            if piece and not is_garbage_piece(piece):
+                current.desc = (current.desc + " " + piece).strip()
+
+            continue
+
+    flush_current(current, in_section)
+    return out
+
+
+# Con pocas páginas no compensa levantar procesos
+_PARALLEL_MIN_PAGES = 5
+
+def _read_page_block(pdf_path: str, indices: List[int]) -> List[Tuple[PageData, List[Tuple[str, TxRow]]]]:
+    """Abre el PDF una vez y lee + procesa las páginas indicadas (corre en un proceso aparte)."""
+    with pdfplumber.open(pdf_path) as pdf:
+        return [_read_and_parse(_page_data(pdf.pages[i])) for i in indices]
+
+def _read_and_parse(pd_: PageData) -> Tuple[PageData, List[Tuple[str, TxRow]]]:
+    return pd_, _parse_movements_page(pd_[1], pd_[2])
+
+def _read_pages(pdf_path: str) -> List[Tuple[PageData, List[Tuple[str, TxRow]]]]:
+    """
+    Texto, palabras y movimientos de cada página, en orden. Con PDFs largos
+    la extracción (lo caro) se reparte en bloques contiguos entre procesos;
+    cada proceso abre el PDF una sola vez para su bloque.
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        n_pages = len(pdf.pages)
+        workers = min(n_pages, os.cpu_count() or 1)
+        if n_pages < _PARALLEL_MIN_PAGES or workers <= 1:
+            return [_read_and_parse(_page_data(p)) for p in pdf.pages]
+    size = -(-n_pages // workers)
+    chunks = [list(range(a, min(a + size, n_pages))) for a in range(0, n_pages, size)]
+    try:
+        with ProcessPoolExecutor(max_workers=len(chunks)) as ex:
+            return [pg for res in ex.map(_read_page_block, [pdf_path] * len(chunks), chunks) for pg in res]
+    except Exception:
+        # sin multiproceso disponible: secuencial
+        return _read_page_block(pdf_path, list(range(n_pages)))
+
+
 # ===========================
 # Extractor principal
 # ===========================
 
 def extract_santander_to_xlsx(pdf_path: str, out_xlsx: str) -> None:
-    # 1) Texto completo para metadatos
-    with pdfplumber.open(pdf_path) as pdf:
-        all_text = "\n".join((p.extract_text() or "") for p in pdf.pages).replace("\u00a0", " ")
-    meta_doc = _extract_header_metadata(all_text, pdf_path)
+    # 0) Una sola lectura del PDF: texto, palabras y movimientos de cada página
+    read = _read_pages(pdf_path)
+    pages = [pg for pg, _ in read]
+    pages_text = [pg[0] for pg in pages]
+
+    # 1) Metadatos: primero solo las primeras páginas; el texto completo si falta algún campo
+    first_page = pages[0] if pages else None
+    meta_doc = _extract_header_metadata("\n".join(pages_text[:_META_PAGES]), pdf_path, first_page)
+    if len(pages_text) > _META_PAGES and any(meta_doc[k] is None for k in _META_REQUIRED):
+        meta_doc = _extract_header_metadata("\n".join(pages_text), pdf_path, first_page)
     pstart = meta_doc["pstart"]; pend = meta_doc["pend"]
 
-    # 2) Productos y saldos anteriores (crudo)
+    # 2) Productos y saldos anteriores (crudo); la CLABE se asigna al unir
+    clabe = meta_doc["clabe"]
+    head_cuenta, prod_cuenta = HEAD_CUENTA.search, PROD_CUENTA.search
+    head_inver, prod_inver = HEAD_INVER.search, PROD_INVER.search
+    saldo_ant = SALDO_ANT_PAT.search
     cuentas_raw: List[Dict[str, Optional[str]]] = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            pt = (page.extract_text() or "").replace("\u00a0", " ")
-            if HEAD_CUENTA.search(pt) or PROD_CUENTA.search(pt):
-                mnum = PROD_CUENTA.search(pt)
-                msaldo = SALDO_ANT_PAT.search(pt)
-                cuentas_raw.append({
-                    "producto": "CUENTA SANTANDER PYME",
-                    "numero": mnum.group(1) if mnum else None,
-                    "clabe": meta_doc["clabe"],
-                    "saldo_ant": _norm_amount(msaldo.group(1)) if msaldo else None,
-                })
-            if HEAD_INVER.search(pt) or PROD_INVER.search(pt):
-                mnum = PROD_INVER.search(pt)
-                msaldo = SALDO_ANT_PAT.search(pt)
-                cuentas_raw.append({
-                    "producto": "INVERSION CRECIENTE",
-                    "numero": mnum.group(1) if mnum else None,
-                    "clabe": None,
-                    "saldo_ant": _norm_amount(msaldo.group(1)) if msaldo else None,
-                })
+    for pt in pages_text:
+        # Cada patrón corre a lo más una vez por página; el saldo se busca solo si hubo producto
+        msaldo = None
+        mnum = prod_cuenta(pt)
+        if mnum or head_cuenta(pt):
+            msaldo = saldo_ant(pt)
+            cuentas_raw.append({
+                "producto": "CUENTA SANTANDER PYME",
+                "numero": mnum.group(1) if mnum else None,
+                "saldo_ant": _norm_amount(msaldo.group(1)) if msaldo else None,
+            })
+        mnum = prod_inver(pt)
+        if mnum or head_inver(pt):
+            if msaldo is None:
+                msaldo = saldo_ant(pt)
+            cuentas_raw.append({
+                "producto": "INVERSION CRECIENTE",
+                "numero": mnum.group(1) if mnum else None,
+                "saldo_ant": _norm_amount(msaldo.group(1)) if msaldo else None,
+            })
 
     # --- Merge de cuentas por *producto*
-    def _merge_accounts(crudo: List[Dict[str, Optional[str]]]) -> List[Dict[str, Optional[str]]]:
+    def _merge_accounts(crudo: List[Dict[str, Optional[str]]], clabe: Optional[str]) -> List[Dict[str, Optional[str]]]:
         merged: Dict[str, Dict[str, Optional[str]]] = {}
         for c in crudo:
             prod = c["producto"]
-            acc = merged.get(prod, {"producto": prod, "numero": None, "clabe": None, "saldo_ant": None})
+            acc = merged.get(prod)
+            if acc is None:
+                acc = merged[prod] = {
+                    "producto": prod,
+                    "numero": None,
+                    "clabe": clabe if prod == "CUENTA SANTANDER PYME" else None,
+                    "saldo_ant": None,
+                }
             if not acc["numero"] and c.get("numero"):
                 acc["numero"] = c["numero"]
-            if prod == "CUENTA SANTANDER PYME":
-                acc["clabe"] = meta_doc["clabe"]
-            else:
-                acc["clabe"] = None
             if acc["saldo_ant"] is None and c.get("saldo_ant") is not None:
                 acc["saldo_ant"] = c["saldo_ant"]
-            merged[prod] = acc
 
         out = []
         for prod in ("CUENTA SANTANDER PYME", "INVERSION CRECIENTE"):
@@ -655,186 +1023,42 @@ def extract_santander_to_xlsx(pdf_path: str, out_xlsx: str) -> None:
                 out.append({
                     "producto": prod,
                     "numero": None,
-                    "clabe": meta_doc["clabe"] if prod == "CUENTA SANTANDER PYME" else None,
+                    "clabe": clabe if prod == "CUENTA SANTANDER PYME" else None,
                     "saldo_ant": None,
                 })
         return out
 
-    cuentas = _merge_accounts(cuentas_raw)
+    cuentas = _merge_accounts(cuentas_raw, clabe)
 
     # 3) Parseo de movimientos (cambio de sección dentro de la misma página)
     movs_cheques: List[TxRow] = []
     movs_inver:   List[TxRow] = []
-
-    def flush_current(cur: Optional[TxRow], section: Optional[str]) -> None:
-        if not cur or not section:
-            return
-        cur.deposito, cur.retiro = _reconcile_amounts(cur.desc, cur.deposito, cur.retiro)
-        (movs_cheques if section == "CUENTA" else movs_inver).append(cur)
-
-    current: Optional[TxRow] = None
-
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            # Determinar la sección SOLO por el primer encabezado visible en los renglones
-            in_section: Optional[str] = None
-
-            words_all = page.extract_words(x_tolerance=2, y_tolerance=2, use_text_flow=True)
-            words = _drop_footer_totals(words_all)
-            bounds, header_y = _detect_columns(words, page.width)
-            rows = _group_rows(words, header_y)
-
-            # Buscar encabezados dentro de la página (con orden visual)
-            markers: Dict[int, str] = {}
-            for idx, r in enumerate(rows):
-                sec = _row_section_marker(r)
-                if sec:
-                    markers[idx] = sec
-
-            # Primera marca manda; si no hay, por defecto 'CUENTA'
-            if markers:
-                in_section = markers[min(markers.keys())]
-            else:
-                in_section = "CUENTA"
-
-            for i, r in enumerate(rows):
-                if i in markers:
-                    flush_current(current, in_section)
-                    current = None
-                    in_section = markers[i]    # cambia sección al vuelo por encabezado
-                    continue
-
-                cols = _assign_cols(r, bounds)
-                fecha_raw, folio_raw, desc_raw, dep_raw, ret_raw, saldo_raw = cols
-                row_text = " ".join(w["text"] for w in r)
-                row_up   = row_text.upper()
-
-                # Saltos obvios
-                if all(tok in row_up for tok in ("FECHA", "FOLIO", "SALDO")):  continue
-                if row_up.strip().startswith("TOTAL"):                         continue
-                if "SALDO FINAL DEL PERIODO" in row_up:                        continue
-                if DETALLES_HEADER_PAT.search(row_up):                         continue
-                if PAGINA_WORD_PAT.search(row_up) or PP_NUM_PAT.search(row_up): continue
-
-                new_date  = bool(DATE_TOKEN_SANT.search(fecha_raw))
-                has_money = any(AMOUNT_RE.search(x or "") for x in (dep_raw, ret_raw, saldo_raw))
-                no_money  = not has_money
-
-                if new_date:
-                    flush_current(current, in_section); current = None
-                    f = _parse_ddmonyyyy(fecha_raw)
-
-                    line_wo_date = DATE_TOKEN_SANT.sub("", row_text, count=1).strip()
-                    line_wo_date = _cut_after_totals(line_wo_date)
-                    line_wo_date = re.sub(r"^\d{5,}\s+", "", line_wo_date)
-                    desc_fb, tail = _extract_tail_run(line_wo_date, 3)
-
-                    dep_fb = ret_fb = 0.0; sal_fb = None
-                    if len(tail) == 3:
-                        dep_fb, ret_fb, sal_fb = tail
-                    elif len(tail) == 2:
-                        wv, dv = _classify_by_keywords(desc_fb.upper(), tail[0]); ret_fb, dep_fb = wv, dv; sal_fb = tail[1]
-                    elif len(tail) == 1:
-                        if _has_total_or_final(row_text):
-                            wv, dv = _classify_by_keywords(desc_fb.upper(), tail[0])
-                            ret_fb, dep_fb = wv, dv
-                        else:
-                            sal_fb = tail[0]
-
-                    dep_col = _pick_amount(dep_raw, "first")
-                    ret_col = _pick_amount(ret_raw, "first")
-                    sal_col = _pick_amount(saldo_raw, "last")
-                    if _has_total_or_final(row_text):
-                        dep_col = ret_col = sal_col = None
-                    if len(tail) >= 2:
-                        dep_col = ret_col = sal_col = None
-
-                    desc_txt = _strip_page_garbage((desc_fb or (desc_raw or "")).strip())
-                    if _is_garbage_piece(desc_txt):
-                        desc_txt = ""
-
-                    dep_in = dep_col if dep_col is not None else (dep_fb or 0.0)
-                    ret_in = ret_col if ret_col is not None else (ret_fb or 0.0)
-                    dep_v, ret_v = _reconcile_amounts(desc_txt, dep_in, ret_in)
-
-                    current = TxRow(
-                        f_oper=f,
-                        folio=folio_raw.strip() or None,
-                        desc=desc_txt,
-                        deposito=dep_v,
-                        retiro=ret_v,
-                        saldo=sal_col if sal_col is not None else sal_fb,
-                    )
-                    continue
-
-                if current and no_money and not new_date and (desc_raw or folio_raw or fecha_raw):
-                    piece_col = (desc_raw or "").strip()
-                    line = re.sub(r"^\d{5,}\s+", "", row_text.strip())
-                    line = _cut_after_totals(line)
-                    piece_fb, _ = _extract_tail_run(line, 3)
-                    piece = _strip_page_garbage(piece_fb if len(piece_fb) > len(piece_col) else piece_col)
-                    if piece and not _is_garbage_piece(piece):
-                        current.desc = (current.desc + " " + piece).strip()
-                    continue
-
-                if current and has_money and not new_date:
-                    text_for_tail = _cut_after_totals(row_text)
-                    desc_fb, tail = _extract_tail_run(text_for_tail, 3)
-
-                    dep_v = ret_v = None; sal_v = None
-                    if len(tail) == 3:
-                        dep_v, ret_v, sal_v = tail
-                    elif len(tail) == 2:
-                        wv, dv = _classify_by_keywords((desc_fb or current.desc).upper(), tail[0])
-                        ret_v, dep_v = wv, dv; sal_v = tail[1]
-                    elif len(tail) == 1:
-                        if _has_total_or_final(row_text):
-                            wv, dv = _classify_by_keywords((desc_fb or current.desc).upper(), tail[0])
-                            ret_v, dep_v = wv, dv
-                        else:
-                            sal_v = tail[0]
-
-                    dep_col = _pick_amount(dep_raw, "first")
-                    ret_col = _pick_amount(ret_raw, "first")
-                    sal_col = _pick_amount(saldo_raw, "last")
-
-                    if len(tail) >= 2:
-                        dep_col = ret_col = sal_col = None
-                    if _has_total_or_final(row_text):
-                        dep_col = ret_col = sal_col = None
-
-                    if dep_col is not None or dep_v is not None:
-                        current.deposito = dep_col if dep_col is not None else (dep_v or 0.0)
-                    if ret_col is not None or ret_v is not None:
-                        current.retiro   = ret_col if ret_col is not None else (ret_v or 0.0)
-                    if sal_col is not None or sal_v is not None:
-                        current.saldo    = sal_col if sal_col is not None else sal_v
-
-                    current.deposito, current.retiro = _reconcile_amounts(current.desc, current.deposito, current.retiro)
-
-                    piece = _strip_page_garbage((desc_fb or desc_raw or "").strip())
-                    if piece and not _is_garbage_piece(piece):
-                        current.desc = (current.desc + " " + piece).strip()
-
-                    continue
-
-            flush_current(current, in_section)
-            current = None
-            # No arrastrar sección a la siguiente página; se recalcula cada una
-            in_section = None
+    for _, page_movs in read:
+        for section, tx in page_movs:
+            (movs_cheques if section == "CUENTA" else movs_inver).append(tx)
 
     # 4) DataFrames de movimientos
     def _txs_to_df(txs: List[TxRow]) -> pd.DataFrame:
         def fmt(d: Optional[date]) -> Optional[str]:
             return d.strftime("%d-%m-%Y") if isinstance(d, date) else None
-        df = pd.DataFrame([{
-            "Fecha": fmt(t.f_oper),
-            "Folio": t.folio,
-            "Descripción": re.sub(r"\s+", " ", (t.desc or "")).strip(),
-            "Depósitos": round(t.deposito or 0.0, 2),
-            "Retiro": round(t.retiro or 0.0, 2),
-            "Saldo": round(t.saldo, 2) if t.saldo is not None else None,
-        } for t in txs], columns=["Fecha", "Folio", "Descripción", "Depósitos", "Retiro", "Saldo"])
+        # Columnas armadas en un solo recorrido; el redondeo va vectorizado
+        ws_sub = WS_RE.sub
+        fechas, folios, descs, deps, rets, sals = [], [], [], [], [], []
+        for t in txs:
+            fechas.append(fmt(t.f_oper))
+            folios.append(t.folio)
+            descs.append(ws_sub(" ", (t.desc or "")).strip())
+            deps.append(t.deposito or 0.0)
+            rets.append(t.retiro or 0.0)
+            sals.append(np.nan if t.saldo is None else t.saldo)
+        df = pd.DataFrame({
+            "Fecha": fechas,
+            "Folio": folios,
+            "Descripción": descs,
+            "Depósitos": np.asarray(deps, dtype=np.float64).round(2),
+            "Retiro": np.asarray(rets, dtype=np.float64).round(2),
+            "Saldo": np.asarray(sals, dtype=np.float64).round(2),
+        })
         return _clean_movements_df(df)
 
     movs_df_cheques = _txs_to_df(movs_cheques)
@@ -842,16 +1066,17 @@ def extract_santander_to_xlsx(pdf_path: str, out_xlsx: str) -> None:
 
     # --- Relleno del "Saldo final del periodo anterior"
     def _infer_opening(df: pd.DataFrame) -> Optional[float]:
+        # Columnas ya numéricas (float64) tras _clean_movements_df: acceso escalar directo
         if df.empty:
             return None
-        r0 = df.iloc[0]
-        sal = r0.get("Saldo")
-        dep = r0.get("Depósitos") or 0.0
-        ret = r0.get("Retiro") or 0.0
-        try:
-            return round(float(sal) - float(dep) + float(ret), 2) if pd.notna(sal) else None
-        except Exception:
+        sal = df["Saldo"].iat[0]
+        if pd.isna(sal):
             return None
+        dep = df["Depósitos"].iat[0]
+        ret = df["Retiro"].iat[0]
+        dep = 0.0 if pd.isna(dep) else dep
+        ret = 0.0 if pd.isna(ret) else ret
+        return round(float(sal - dep + ret), 2)
 
     for c in cuentas:
         if c["saldo_ant"] is None:
@@ -886,7 +1111,8 @@ def extract_santander_to_xlsx(pdf_path: str, out_xlsx: str) -> None:
     ])
 
     # 6) Excel
-    with pd.ExcelWriter(out_xlsx, engine="openpyxl") as xl:
+    # Sin constant_memory: pandas escribe por columnas y ese modo exige orden por filas
+    with pd.ExcelWriter(out_xlsx, engine=_XLSX_ENGINE) as xl:
         info_df.to_excel(xl, index=False, sheet_name="info")
         cuenta_df.to_excel(xl, index=False, sheet_name="cuenta")
         movs_df_cheques.to_excel(xl, index=False, sheet_name="movimientos_cuenta")